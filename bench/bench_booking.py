@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+Benchmarks xbook's hot path against a local mock of X's backbone API.
+
+Reports latency percentiles and throughput for `booking_schedule` and
+`book_slot`, the reaction latency of `attempt_booking` between a slot becoming
+available and its participation request arriving, and the CPU time and peak
+RSS spent by xbook itself. The mock runs in a separate process, so it doesn't
+count towards the measured resource usage.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark xbook against a local mock of X's API.")
+
+    parser.add_argument("--latency", type=float, default=0.02,
+        help="The mock API's latency per request in seconds.")
+    parser.add_argument("--payload-size", type=int, default=200,
+        help="The number of slots in each schedule response.")
+    parser.add_argument("--requests", type=int, default=200,
+        help="The number of requests per request type.")
+    parser.add_argument("--runs", type=int, default=5,
+        help="The number of attempt_booking runs.")
+    parser.add_argument("--interval", type=float, default=1,
+        help="The poll interval passed to attempt_booking.")
+    parser.add_argument("--workers", type=int, default=1,
+        help="The number of poll workers passed to attempt_booking.")
+    parser.add_argument("--json", action="store_true",
+        help="Print the results as JSON.")
+
+    return parser.parse_args()
+
+
+def start_mock():
+    """
+    Starts the mock API in a subprocess and returns the process and its URL.
+    """
+    mock = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "mock_backbone.py")],
+        stdout=subprocess.PIPE, text=True
+    )
+    url = mock.stdout.readline().split()[-1]
+
+    return (mock, url)
+
+
+def control(url, path, config=None):
+    """
+    Sends a request to one of the mock API's control endpoints.
+    """
+    data = json.dumps(config).encode() if config is not None else None
+    with urllib.request.urlopen(f"{url}{path}", data=data) as r:
+        return json.load(r)
+
+
+def percentiles(samples, ps=(50, 90, 99)):
+    """
+    Returns the given percentiles of `samples` in milliseconds, along with the
+    maximum.
+    """
+    if not samples:
+        return {}
+
+    ordered = sorted(samples)
+    result = {
+        f"p{p}": ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000
+        for p in ps
+    }
+    result["max"] = ordered[-1] * 1000
+
+    return result
+
+
+def measure(f, n):
+    """
+    Calls `f` `n` times and returns the latency percentiles, the throughput
+    and the CPU time spent.
+    """
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(n):
+            t = time.perf_counter()
+            f()
+            latencies.append(time.perf_counter() - t)
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        "latency_ms": percentiles(latencies),
+        "requests_per_second": n / elapsed,
+        "cpu_seconds": time.process_time() - cpu_start
+    }
+
+
+def bench_attempt_booking(url, config, slot_str, runs, interval, workers):
+    """
+    Repeatedly lets `attempt_booking` watch the mock's target slot, which
+    becomes available at a random moment, and returns the reaction latencies
+    measured by the mock.
+    """
+    from auth import AuthMethod
+    import booking
+    from booking import attempt_booking
+    from time_slot_manip import shift_time_slot_str
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+
+    latencies = []
+    for _ in range(runs):
+        control(url, "/_config", {
+            **config, "slot_start": slot_str,
+            "flip_after": random.uniform(1, 3)
+        })
+
+        # Book the same slot anew in every run
+        booking._booked_slots.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            attempt_booking(
+                slot_str, slot_str, shift_time_slot_str(slot_str, 3600), None,
+                "bench@example.com", "bench", AuthMethod.OTHER, 28,
+                interval=interval, workers=workers
+            )
+
+        latencies += control(url, "/_stats")["reaction_latencies"]
+
+    return {
+        "reaction_latency_ms": percentiles(latencies),
+        "seconds_per_run": (time.perf_counter() - start) / runs,
+        "cpu_seconds_per_run": (time.process_time() - cpu_start) / runs
+    }
+
+
+def main(args):
+    (mock, url) = start_mock()
+    os.environ["XBOOK_API_URL"] = url
+    os.environ["XBOOK_CACHE_DIR"] = tempfile.mkdtemp(prefix="xbook-bench-")
+
+    # Only import xbook's modules now that they can pick up the mock's URL
+    from auth import AuthMethod, auth
+    import booking
+    from booking import book_slot, booking_schedule
+    from time_slot_manip import shift_time_slot_str
+
+    try:
+        config = {"latency": args.latency, "payload_size": args.payload_size}
+        control(url, "/_config", {**config, "flip_after": 0})
+
+        with urllib.request.urlopen(f"{url}/bookable-slots") as r:
+            slot_str = json.load(r)["data"][0]["startDate"]
+        end_str = shift_time_slot_str(slot_str, 3600)
+
+        (session, token, member_id) = auth(
+            "bench@example.com", "bench", AuthMethod.OTHER
+        )
+        slot = booking_schedule(slot_str, end_str)[0]
+
+        results = {
+            "booking_schedule": measure(
+                lambda: booking_schedule(slot_str, end_str), args.requests
+            ),
+            "book_slot": measure(
+                lambda: booking._booked_slots.clear() or
+                    book_slot(slot, member_id, session, token),
+                args.requests
+            ),
+            "attempt_booking": bench_attempt_booking(
+                url, config, slot_str, args.runs, args.interval,
+                args.workers
+            ),
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        }
+    finally:
+        mock.terminate()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    for (name, result) in results.items():
+        print(f"{name}: {result}")
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmarks xbook's cold start, i.e., the time it takes to start the
+interpreter, import xbook and resolve the booking category, as well as the
+time spent resolving categories through the alias tables and through fuzzy
+matching.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+CATEGORIES = ["gym", "beach", "volley", "x1", "x1a", "hall_x3b", "court 1"]
+
+STARTUP_SCRIPT = """
+import argparse
+import xbook
+for category in {categories!r}:
+    xbook.process_args(argparse.Namespace(booking_category=category, court=None))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark xbook's startup time.")
+
+    parser.add_argument("--runs", type=int, default=20,
+        help="The number of cold starts to measure.")
+    parser.add_argument("--max-ms", type=float, default=None,
+        help="Exit with a non-zero status if the median cold start exceeds this many milliseconds.")
+
+    return parser.parse_args()
+
+
+def bench_cold_start(runs):
+    """
+    Returns the wall-clock durations of `runs` fresh interpreters that import
+    xbook and resolve all benchmarked categories.
+    """
+    script = STARTUP_SCRIPT.format(categories=CATEGORIES)
+
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR, check=True)
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+def bench_resolution(runs=1000):
+    """
+    Returns the average time in microseconds needed to resolve a category
+    through the alias tables and through fuzzy matching.
+    """
+    from fuzzywuzzy import process
+
+    from booking_tag_id import BOOKING_TAG_ID_STRING_MAP, BookingTagId
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for category in CATEGORIES:
+            BookingTagId.from_string(category)
+    alias_us = (time.perf_counter() - start) / (runs * len(CATEGORIES)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(runs // 10):
+        for category in CATEGORIES:
+            process.extractOne(category, BOOKING_TAG_ID_STRING_MAP.keys())
+    fuzzy_us = (time.perf_counter() - start) / \
+        (runs // 10 * len(CATEGORIES)) * 1e6
+
+    return (alias_us, fuzzy_us)
+
+
+def main(args):
+    durations = bench_cold_start(args.runs)
+    median_ms = statistics.median(durations) * 1000
+    (alias_us, fuzzy_us) = bench_resolution()
+
+    print(f"Cold start: median {median_ms:.1f} ms, "
+          f"min {min(durations) * 1000:.1f} ms, "
+          f"max {max(durations) * 1000:.1f} ms")
+    print(f"Category resolution: {alias_us:.1f} µs through aliases, "
+          f"{fuzzy_us:.1f} µs through fuzzy matching")
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"[!] Median cold start exceeds {args.max_ms} ms.")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main(parse_args())
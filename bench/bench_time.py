@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks xbook's time helpers against the `strptime`-based helpers
+they replaced, on the operations that run for every slot in every poll.
+"""
+import argparse
+import calendar
+from datetime import datetime, timedelta
+import os
+import random
+import sys
+import timeit
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+import time_slot_manip
+
+
+def legacy_seconds_diff(start_str, end_str):
+    start = start_str if isinstance(start_str, datetime) \
+        else datetime.strptime(start_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+    end = datetime.strptime(end_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return int((end - start).total_seconds())
+
+
+def legacy_shift_time_slot_str(time_slot_str, seconds):
+    t = datetime.strptime(time_slot_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return (t + timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def legacy_time_slot_str_to_epoch(time_slot_str):
+    t = datetime.strptime(time_slot_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+    return calendar.timegm(t.timetuple()) + t.microsecond / 1e6
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark xbook's time helpers.")
+
+    parser.add_argument("--slots", type=int, default=200,
+        help="The number of distinct slot timestamps per simulated poll.")
+    parser.add_argument("--polls", type=int, default=50,
+        help="The number of simulated polls per measurement.")
+
+    return parser.parse_args()
+
+
+def measure(name, legacy, current, number):
+    legacy_time = min(timeit.repeat(legacy, number=number, repeat=5))
+    current_time = min(timeit.repeat(current, number=number, repeat=5))
+
+    print(f"{name:<24} {legacy_time / number * 1e6:10.2f} µs "
+          f"{current_time / number * 1e6:10.2f} µs "
+          f"{legacy_time / current_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    start = datetime(2024, 7, 20, 6)
+    slots = [
+        (start + timedelta(minutes=random.randint(0, 60 * 24 * 7)))
+        .strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        for _ in range(args.slots)
+    ]
+    now = datetime.utcnow()
+
+    print(f"{'Operation per poll':<24} {'strptime':>13} {'current':>13} "
+          f"{'speedup':>9}")
+
+    measure(
+        "parse",
+        lambda: [legacy_time_slot_str_to_epoch(s) for s in slots],
+        lambda: [time_slot_manip.time_slot_str_to_epoch(s) for s in slots],
+        args.polls
+    )
+    measure(
+        "seconds until",
+        lambda: [legacy_seconds_diff(now, s) for s in slots],
+        lambda: [time_slot_manip.seconds_until(s) for s in slots],
+        args.polls
+    )
+    measure(
+        "shift by an hour",
+        lambda: [legacy_shift_time_slot_str(s, 3600) for s in slots],
+        lambda: [time_slot_manip.shift_time_slot_str(s, 3600) for s in slots],
+        args.polls
+    )
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+"""
+A local stand-in for X's backbone API that serves `/bookable-slots`, `/auth`,
+`/auth?cf=0`, `/products/{id}` and `/participations` with configurable latency, payload size and
+availability of a single target slot.
+
+Besides X's endpoints, it exposes `POST /_config` to reconfigure it and
+`GET /_stats` to obtain request counts and the reaction latencies between the
+target slot becoming available and it being booked.
+"""
+import argparse
+import base64
+from datetime import datetime, timedelta, timezone
+import gzip
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+class MockBackbone:
+    """
+    Holds the configuration and state of the mock API.
+
+    The target slot starts at `slot_start` and becomes available `flip_after`
+    seconds after the last reconfiguration. If `flip_every` is set, its
+    availability keeps toggling every `flip_every` seconds after that.
+
+    Every product can be booked `minutes_ahead` minutes in advance.
+
+    A fraction `error_rate` of the schedule and participation requests fails,
+    with a 429 response and a `Retry-After` header if `retry_after` is set
+    and with a 503 response otherwise.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configure({})
+
+    def configure(self, config):
+        with self.lock:
+            self.latency = float(config.get("latency", 0))
+            self.payload_size = int(config.get("payload_size", 50))
+            self.flip_after = config.get("flip_after")
+            self.flip_every = config.get("flip_every")
+            self.error_rate = float(config.get("error_rate", 0))
+            self.retry_after = config.get("retry_after")
+            self.minutes_ahead = int(config.get("minutes_ahead", 10080))
+            self.slot_start = config.get("slot_start") or (
+                datetime.now(timezone.utc) + timedelta(hours=1)
+            ).strftime("%Y-%m-%dT%H:00:00.000Z")
+
+            self.configured_at = time.time()
+            self.request_counts = {}
+            self.reaction_latencies = []
+            self.booked_flips = set()
+
+    def available_since(self, now):
+        """
+        Returns the time at which the target slot last became available, or
+        `None` if it is currently unavailable.
+        """
+        if self.flip_after is None:
+            return None
+
+        first_flip = self.configured_at + float(self.flip_after)
+        if now < first_flip:
+            return None
+        if not self.flip_every:
+            return first_flip
+
+        flips = int((now - first_flip) // float(self.flip_every))
+        if flips % 2 == 1:
+            return None
+
+        return first_flip + flips * float(self.flip_every)
+
+    def schedule(self, now):
+        """
+        Returns the bookable slots, consisting of the target slot and
+        `payload_size - 1` unavailable filler slots.
+        """
+        start = datetime.strptime(self.slot_start, "%Y-%m-%dT%H:%M:%S.%fZ")
+        slots = []
+        for i in range(self.payload_size):
+            slot_start = start + timedelta(minutes=i)
+            slots.append({
+                "startDate": slot_start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "endDate": (slot_start + timedelta(hours=1)).strftime(
+                    "%Y-%m-%dT%H:%M:%S.000Z"
+                ),
+                "isAvailable": i == 0 and self.available_since(now) is not None,
+                "bookableProductId": 28,
+                "linkedProductId": 20000 + i,
+                "bookingId": 100000 + i,
+                "product": {"description": "Filler " * 20}
+            })
+
+        return {"data": slots, "count": len(slots), "total": len(slots)}
+
+    def participate(self, now):
+        """
+        Books the target slot if it is available and records the reaction
+        latency for the first booking after each time it became available.
+        """
+        available_since = self.available_since(now)
+        if available_since is None:
+            return False
+
+        if available_since not in self.booked_flips:
+            self.booked_flips.add(available_since)
+            self.reaction_latencies.append(now - available_since)
+
+        return True
+
+    def count(self, endpoint):
+        self.request_counts[endpoint] = \
+            self.request_counts.get(endpoint, 0) + 1
+
+    def stats(self):
+        return {
+            "request_counts": self.request_counts,
+            "reaction_latencies": self.reaction_latencies
+        }
+
+
+def make_token():
+    """
+    Returns a JWT-shaped access token that expires in an hour.
+    """
+    claims = json.dumps({"exp": int(time.time()) + 3600}).encode()
+    payload = base64.urlsafe_b64encode(claims).decode().rstrip("=")
+    return f"mock.{payload}.signature"
+
+
+class MockBackboneHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    backbone = None
+
+    def do_HEAD(self):
+        self._respond(200, None)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/_stats":
+            return self._respond(200, self.backbone.stats())
+
+        self._simulate_latency(url.path)
+        if url.path == "/bookable-slots":
+            if self._simulate_failure():
+                return
+
+            body = self.backbone.schedule(time.time())
+
+            # Honour field projections like X's backend does
+            fields = parse_qs(url.query).get("fields")
+            if fields:
+                fields = fields[0].split(",")
+                body["data"] = [
+                    {f: slot[f] for f in fields if f in slot}
+                    for slot in body["data"]
+                ]
+
+            return self._respond(200, body, conditional=True)
+        if url.path == "/auth":
+            return self._respond(200, {"id": 1234567})
+        if url.path.startswith("/products/"):
+            return self._respond(200, {
+                "id": int(url.path.rsplit("/", 1)[1]),
+                "bookableSlotsMinutesAhead": self.backbone.minutes_ahead
+            })
+
+        self._respond(404, {"message": "Not found"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        request = self._read_body()
+        if url.path == "/_config":
+            self.backbone.configure(json.loads(request or b"{}"))
+            return self._respond(200, {})
+
+        self._simulate_latency(url.path)
+        if url.path == "/auth":
+            return self._respond(200, {"access_token": make_token()})
+        if url.path == "/participations":
+            if self._simulate_failure():
+                return
+
+            with self.backbone.lock:
+                booked = self.backbone.participate(time.time())
+            if booked:
+                return self._respond(201, {"id": 42})
+            return self._respond(400, {"message": "Slot is fully booked"})
+
+        self._respond(404, {"message": "Not found"})
+
+    def do_DELETE(self):
+        url = urlsplit(self.path)
+        self._simulate_latency(url.path)
+        if url.path.startswith("/participations/"):
+            return self._respond(200, {})
+
+        self._respond(404, {"message": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+    def _simulate_latency(self, endpoint):
+        with self.backbone.lock:
+            self.backbone.count(f"{self.command} {endpoint}")
+            latency = self.backbone.latency
+
+        if latency:
+            time.sleep(latency)
+
+    def _simulate_failure(self):
+        """
+        Responds with an error and returns `True` for a fraction of requests
+        according to the configured error rate.
+        """
+        if random.random() >= self.backbone.error_rate:
+            return False
+
+        if self.backbone.retry_after is not None:
+            self.send_response(429)
+            self.send_header("retry-after", str(self.backbone.retry_after))
+        else:
+            self.send_response(503)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+        return True
+
+    def _read_body(self):
+        length = int(self.headers.get("content-length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _respond(self, status, body, conditional=False):
+        data = json.dumps(body).encode() if body is not None else b""
+        headers = {"content-type": "application/json"}
+
+        if conditional:
+            etag = f'"{hashlib.sha1(data).hexdigest()}"'
+            headers["etag"] = etag
+            if self.headers.get("if-none-match") == etag:
+                (status, data) = (304, b"")
+
+        if data and "gzip" in self.headers.get("accept-encoding", ""):
+            data = gzip.compress(data, compresslevel=1)
+            headers["content-encoding"] = "gzip"
+
+        self.send_response(status)
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+
+def serve(port=0, host="127.0.0.1"):
+    """
+    Starts the mock API on the given `port` and blocks until interrupted. A
+    `port` of 0 selects a free port, which is printed on startup.
+    """
+    MockBackboneHandler.backbone = MockBackbone()
+    server = ThreadingHTTPServer((host, port), MockBackboneHandler)
+    server.daemon_threads = True
+
+    print(f"Listening on http://{host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for X's backbone API.")
+    parser.add_argument("--port", type=int, default=0,
+        help="The port to listen on. Defaults to a free port.")
+    args = parser.parse_args()
+
+    serve(args.port)
@@ -0,0 +1,6 @@
+from collections import namedtuple
+
+
+# The configuration of a single X account. `username` contains the account's
+# NetID or email address, depending on its `auth_method`.
+Account = namedtuple("Account", ["username", "member_id", "auth_method"])
@@ -0,0 +1,57 @@
+import re
+
+
+def normalise(s):
+    """
+    Returns the given string in lowercase without any non-alphanumeric
+    characters, e.g., "Hall_X1A" becomes "hallx1a".
+    """
+    return re.sub(r"[^a-z0-9]", "", s.lower())
+
+
+def build_alias_table(members):
+    """
+    Precomputes a table that maps aliases of the given enum `members` to those
+    members.
+
+    The aliases of a member consist of its normalised name and every trailing
+    part of its name, e.g., "beachvolleyballcourt", "volleyballcourt" and
+    "court". Prefixes of aliases are stored separately. Ambiguous aliases
+    resolve to the first matching member in the order given.
+
+    Returns an `(aliases, prefixes)` tuple of dictionaries.
+    """
+    aliases = {}
+    prefixes = {}
+    for member in members:
+        words = member.name.lower().split("_")
+        for i in range(len(words)):
+            alias = "".join(words[i:])
+            aliases.setdefault(alias, member)
+            for j in range(1, len(alias)):
+                prefixes.setdefault(alias[:j], member)
+
+    return (aliases, prefixes)
+
+
+def resolve_alias(s, table):
+    """
+    Returns the member for the given string `s` according to the alias
+    `table`, or `None` if there is no matching alias.
+
+    Strings that start with an alias of at least two characters, e.g., "x1a"
+    for a member with the alias "x1", resolve to the member with the longest
+    such alias.
+    """
+    (aliases, prefixes) = table
+    key = normalise(s)
+    if key in aliases:
+        return aliases[key]
+    if key in prefixes:
+        return prefixes[key]
+
+    for end in range(len(key) - 1, 1, -1):
+        if key[:end] in aliases:
+            return aliases[key[:end]]
+
+    return None
@@ -1,14 +1,15 @@
-from enum import Enum
 import json
 import pkce
 import re
-import requests
 
+from auth_method import AuthMethod
+from constants import API_URL
+from http_client import AUTH_TIMEOUT, new_session
+from metrics import timed_request
 
-class AuthMethod(Enum):
-    TUD_SSO = 0
-    OTHER = 1
 
+TUD_CLIENT_ID = "web-sporter-frontend.production.delft.delcom.nl"
+TUD_TOKEN_URL = "https://connect.surfconext.nl/oidc/token"
 
 def auth(username, passw, auth_method=AuthMethod.OTHER):
     print(f"Authenticating with method '{auth_method.name}'...")
@@ -25,6 +26,17 @@ def tud_auth(netid, passw):
     """
     Authenticates to X through TU Delft's Single Sign-On mechanism.
     """
+    (s, tokens) = tud_login(netid, passw)
+
+    return (s, tokens["access_token"], fetch_member_id(s, "tud_auth.r7"))
+
+
+def tud_login(netid, passw):
+    """
+    Logs in through TU Delft's Single Sign-On mechanism and returns the
+    authenticated session along with the token response, which contains an
+    `access_token` and usually a `refresh_token`.
+    """
     auth_url0 = "https://connect.surfconext.nl/oidc/authorize?redirect_uri" + \
                 "=https://x.tudelft.nl/oidc/auth-callback&client_id=web-sp" + \
                 "orter-frontend.production.delft.delcom.nl&response_type=c" + \
@@ -34,10 +46,12 @@ def tud_auth(netid, passw):
     auth_url1 = "https://engine.surfconext.nl/authentication/idp/process-wayf"
     login_url = "https://login.tudelft.nl/sso/module.php/core/loginuserpass.php?"
 
-    s = requests.Session()
+    s = new_session()
 
     # Construct required auth payload
-    r0 = s.get(auth_url0)
+    r0 = timed_request(
+        "tud_auth.r0", s.get, auth_url0, timeout=AUTH_TIMEOUT
+    )
     payload = {
         "ID": extract_auth_idp_id(r0.text),
         "idp": "https://login.tudelft.nl/sso/saml2/idp/metadata.php"
@@ -45,17 +59,25 @@ def tud_auth(netid, passw):
 
     # Request authorisation through auth_url1, resulting in 2 redirects. The
     # destination's URL contains the AuthState required for login.
-    r1 = s.post(auth_url1, data=payload)
+    r1 = timed_request(
+        "tud_auth.r1", s.post, auth_url1, data=payload, timeout=AUTH_TIMEOUT
+    )
     authstate = re.search("AuthState=(.*?)>", r1.text).group(1)
 
     # Construct login POST request & extract the SAMLResponse
     login_data = {"username": netid, "password": passw, "AuthState": authstate}
-    r2 = s.post(login_url, data=login_data)
+    r2 = timed_request(
+        "tud_auth.r2", s.post, login_url, data=login_data,
+        timeout=AUTH_TIMEOUT
+    )
     saml_resp = extract_saml_response(r2.text, end_char='">')
 
     # Obtain the second SAML response
     url = "https://engine.surfconext.nl/authentication/sp/consume-assertion"
-    r3 = s.post(url, data={"SAMLResponse": saml_resp})
+    r3 = timed_request(
+        "tud_auth.r3", s.post, url, data={"SAMLResponse": saml_resp},
+        timeout=AUTH_TIMEOUT
+    )
     saml_resp = re.search(r'value=(.*?)">', r3.text).group(1)
 
     # Obtain session token after login
@@ -68,58 +90,123 @@ def tud_auth(netid, passw):
     # r4 = s.post(saml_url, data=saml_payload)  # Handles 2 redirects
 
     # Option 2: Craft our own PKCE code_verifier and code_challenge
-    r4 = s.post(saml_url, data=saml_payload, allow_redirects=False)  # Obtain required cookies
+    r4 = timed_request(  # Obtain required cookies
+        "tud_auth.r4", s.post, saml_url, data=saml_payload,
+        allow_redirects=False, timeout=AUTH_TIMEOUT
+    )
     code_verifier = pkce.generate_code_verifier(length=128)
     code_challenge = pkce.get_code_challenge(code_verifier)
     pkce_state = re.search("state=(.*?)&", r4.headers['location']).group(1)
     pkce_auth_url = f"https://connect.surfconext.nl/oidc/authorize?redirect_uri=https://x.tudelft.nl/oidc/auth-callback&client_id=web-sporter-frontend.production.delft.delcom.nl&response_type=code&state={pkce_state}&scope=openid&access_type=offline&code_challenge={code_challenge}&code_challenge_method=S256"
-    r5 = s.get(pkce_auth_url)
+    r5 = timed_request(
+        "tud_auth.r5", s.get, pkce_auth_url, timeout=AUTH_TIMEOUT
+    )
 
     auth_code = re.search("code=(.*?)&", r5.url).group(1)
 
-    token_url = "https://connect.surfconext.nl/oidc/token"
     token_payload = {
         "grant_type": "authorization_code",
-        "client_id": "web-sporter-frontend.production.delft.delcom.nl",
+        "client_id": TUD_CLIENT_ID,
         "redirect_uri": "https://x.tudelft.nl/oidc/auth-callback",
         "code": auth_code,
         "code_verifier": code_verifier
     }
-    r6 = s.post(token_url, data=token_payload)
-    token = r6.json()['access_token']
-    s.headers["authorization"] = f"Bearer {token}"
-    s.headers["authority"] = "backbone-web-api.production.delft.delcom.nl"
+    r6 = timed_request(
+        "tud_auth.r6", s.post, TUD_TOKEN_URL, data=token_payload,
+        timeout=AUTH_TIMEOUT
+    )
+    tokens = r6.json()
+    set_auth_headers(s, tokens["access_token"])
 
-    # TODO: Might be able to obtain member ID from https://backbone-web-api.production.delft.delcom.nl/auth
-    r7 = s.get("https://backbone-web-api.production.delft.delcom.nl/auth?cf=0")
+    return (s, tokens)
 
-    user_info = json.loads(r7.text)
-    member_id = user_info["id"] if "id" in user_info else None
 
-    return (s, token, member_id)
+def tud_refresh(refresh_token):
+    """
+    Obtains a new access token for TU Delft's Single Sign-On mechanism with a
+    `refresh_token` from an earlier login, which only takes a single request.
+
+    Returns the authenticated session along with the token response, which
+    may contain a new refresh token. Raises an exception if the refresh token
+    was rejected.
+    """
+    s = new_session()
+    token_payload = {
+        "grant_type": "refresh_token",
+        "client_id": TUD_CLIENT_ID,
+        "refresh_token": refresh_token
+    }
+    r = timed_request(
+        "tud_refresh", s.post, TUD_TOKEN_URL, data=token_payload,
+        timeout=AUTH_TIMEOUT
+    )
+    r.raise_for_status()
+
+    tokens = r.json()
+    set_auth_headers(s, tokens["access_token"])
+
+    return (s, tokens)
+
+
+def fetch_member_id(s, phase="member_id"):
+    """
+    Returns the member ID of the user authenticated in session `s`, or `None`
+    if X doesn't provide it.
+    """
+    r = timed_request(
+        phase, s.get, f"{API_URL}/auth?cf=0", timeout=AUTH_TIMEOUT
+    )
+
+    user_info = json.loads(r.text)
+    return user_info["id"] if "id" in user_info else None
 
 
 def other_auth(email, passw):
     """
     Authenticates through X's authentication portal for non-TUD users.
     """
-    auth_url = "https://backbone-web-api.production.delft.delcom.nl/auth"
+    auth_url = f"{API_URL}/auth"
 
-    s = requests.Session()
-    r0 = s.post(auth_url, data={"email": email, "password": passw})
+    s = new_session()
+    r0 = timed_request(
+        "other_auth.r0", s.post, auth_url,
+        data={"email": email, "password": passw}, timeout=AUTH_TIMEOUT
+    )
 
     # Extract and set authorisation headers
     tokens = json.loads(r0.text)
-    s.headers["authorization"] = f"Bearer {tokens['access_token']}"
-    s.headers["authority"] = "backbone-web-api.production.delft.delcom.nl"
+    set_auth_headers(s, tokens["access_token"])
 
     # Authenticated requests now allow us to obtain user information
-    user_info = json.loads(s.get(f"{auth_url}?cf=0").text)
+    r1 = timed_request(
+        "other_auth.r1", s.get, f"{auth_url}?cf=0", timeout=AUTH_TIMEOUT
+    )
+    user_info = json.loads(r1.text)
     member_id = user_info["id"] if "id" in user_info else None
 
     return (s, tokens["access_token"], member_id)
 
 
+def session_from_token(token):
+    """
+    Creates a session that is authenticated with a previously obtained access
+    `token`.
+    """
+    s = new_session()
+    set_auth_headers(s, token)
+
+    return s
+
+
+def set_auth_headers(s, token):
+    """
+    Sets the headers required to make authenticated requests to X's backend
+    with the given access `token` on session `s`.
+    """
+    s.headers["authorization"] = f"Bearer {token}"
+    s.headers["authority"] = API_URL.split("://")[1]
+
+
 def extract_auth_idp_id(html):
     """
     Extracts and returns the ID string from the `html` content obtained with
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class AuthMethod(Enum):
+    TUD_SSO = 0
+    OTHER = 1
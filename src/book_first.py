@@ -0,0 +1,81 @@
+import time
+
+from booking import (
+    attempt_booking, book_authenticated, booking_schedule, find_slot,
+    get_booking_window
+)
+from booking_result import BookingResult
+from booking_tag_id import BookingTagId
+from http_client import warm_up
+from retry_policy import BOOKING_POLICY
+from session_cache import AuthSession
+from time_slot_manip import shift_time_slot_str, time_slot_str_to_epoch
+
+
+def book_first(slot_str, member_id, username, passw, auth_method, tag_id,
+               subcategory_id=None, rate=2):
+    """
+    Attempts to book the slot starting at the given `slot_str` without
+    checking its availability first, at most `rate` times per second, until
+    the booking succeeds or the slot starts.
+
+    The slot's static fields are obtained with a single schedule request,
+    after which every attempt takes a single round trip. Attempts rejected
+    because the slot is full don't count as errors.
+
+    Falls back to regular booking attempts if the slot's booking window
+    hasn't opened yet.
+    """
+    slot_end = shift_time_slot_str(slot_str, 3600)
+    product_ids = [subcategory_id] if subcategory_id is not None else None
+    slot_start = time_slot_str_to_epoch(slot_str)
+
+    warm_up()
+
+    slots = booking_schedule(slot_str, slot_end, tag_id, product_ids) or []
+    slot = find_slot(slot_str, slots, ignore_availability=True,
+                     subcategory_id=subcategory_id)
+    if slot is None:
+        print(f"Could not find a slot starting at {slot_str}. Exiting.")
+        exit(0)
+
+    booking_window = get_booking_window(
+        BookingTagId(tag_id), slot["linkedProductId"]
+    )
+    if slot_start - booking_window > time.time():
+        print("Booking window hasn't opened yet. Attempting regularly.")
+        return attempt_booking(
+            slot_str, slot_str, slot_end, member_id, username, passw,
+            auth_method, tag_id, subcategory_id
+        )
+
+    auth_session = AuthSession(username, passw, auth_method)
+    auth_session.start_refreshing()
+
+    print(f"Booking slot at {slot_str} up to {rate:g} time(s) per second.")
+
+    next_attempt = time.monotonic()
+    result = None
+    while time.time() < slot_start:
+        delay = next_attempt - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_attempt = max(next_attempt + 1 / rate, time.monotonic())
+
+        (result, _) = book_authenticated(slot, member_id, auth_session)
+        if result in (BookingResult.BOOKED, BookingResult.ALREADY_BOOKED):
+            break
+        if result == BookingResult.FULL:
+            continue
+
+        # Back off for as long as booking requests are suspended
+        next_attempt += BOOKING_POLICY.blocked_for()
+
+    auth_session.close()
+
+    if result == BookingResult.BOOKED:
+        print(f"Succesfully booked slot at {slot_str} (UTC)!")
+    elif result == BookingResult.ALREADY_BOOKED:
+        print(f"Slot at {slot_str} was already booked. Exiting.")
+    else:
+        print(f"Slot at {slot_str} has started. Giving up.")
@@ -1,100 +1,371 @@
-from datetime import datetime
-import json
-import requests
-import time
+import codecs
 
-from auth import auth, terminate_session
+from booking_result import BookingResult
 from booking_tag_id import BookingTagId, BOOKING_TAG_ID_BOOKING_WINDOW_MAP
-from time_slot_manip import date_and_hour_to_time_slot_str, seconds_diff
+from candidate_ranking import CandidateRanking
+from constants import API_URL
+from daemon_client import subscribe_schedule
+from history import cancellation_profile
+from http_client import (
+    BOOKING_TIMEOUT, SCHEDULE_TIMEOUT, shared_session, warm_up
+)
+from json_stream import JsonArrayStream
+from metrics import increment, timed_request
+from poll_scheduler import PollScheduler
+from poller_pool import PollerPool
+from product_cache import product_booking_window, tag_booking_window
+from retry_policy import BOOKING_POLICY, SCHEDULE_POLICY, CircuitOpenError
+from schedule_query import (
+    bookable_slots_url, demultiplex, plan_queries, query_url
+)
+from session_cache import AuthSession
+from schedule_events import ScheduleEvents
+from slot_store import SlotEventType
+from targets import Candidate
+from time_slot_manip import (
+    date_and_hour_to_time_slot_str, seconds_until, shift_time_slot_str
+)
+
+
+# Maps schedule request URLs, or other cache keys, to their last ETag and data
+_schedule_cache = {}
+
+# Slots booked by this process, by member ID, start time and product ID
+_booked_slots = set()
+
+# Fragments of the messages with which X rejects bookings of full slots and
+# of slots the user already booked. Ending a watch requires a message that
+# explicitly says the user booked the slot.
+FULL_MESSAGES = ("full", "no places", "no spots", "capacity", "not available")
+ALREADY_BOOKED_MESSAGES = (
+    "already booked", "already registered", "already participating",
+    "already signed up", "already have a booking", "already has a booking",
+    "duplicate booking", "duplicate participation"
+)
+
+# Events of the watched slot that are reported to the user
+NOTIFIED_EVENTS = {
+    SlotEventType.FREED: "became available",
+    SlotEventType.FILLED: "was taken",
+    SlotEventType.WINDOW_OPENED: "booking window opened"
+}
 
 
 def login_and_book_slot(uname, passw, mem_id, auth_meth, date, hour, in_utc,
-                        tag_id=BookingTagId.GYM.value, subcategory_id=None):
+                        tag_id=BookingTagId.GYM.value, subcategory_id=None,
+                        daemon_socket=None, workers=1, fallbacks=None):
     """
     Authenticates to X with the given credentials and attempts to book a time
     slot corresponding to the given start `hour` on the given `day` for the
-    booking category corresponding to the given `tag_id`.
+    booking category corresponding to the given `tag_id`, or else the best
+    of the given `fallbacks`.
     """
-    day_start = date_and_hour_to_time_slot_str(date, 0, in_utc=True)
-    day_end = date_and_hour_to_time_slot_str(date, 23, in_utc=True)
     slot_str = date_and_hour_to_time_slot_str(date, hour, in_utc=in_utc)
+    slot_end = shift_time_slot_str(slot_str, 3600)
 
     attempt_booking(
-        slot_str, day_start, day_end, mem_id, uname, passw, auth_meth, tag_id,
-        subcategory_id
+        slot_str, slot_str, slot_end, mem_id, uname, passw, auth_meth, tag_id,
+        subcategory_id, daemon_socket=daemon_socket, workers=workers,
+        fallbacks=fallbacks
     )
 
 
 def attempt_booking(slot_str, start_str, end_str, member_id, username, passw,
-                    auth_method, tag_id, subcategory_id=None, interval=1):
+                    auth_method, tag_id, subcategory_id=None, interval=1,
+                    daemon_socket=None, after_booking=None, workers=1,
+                    fallbacks=None):
     """
-    Continuously checks in intervals of `interval` seconds if the time slot
-    with the given `slot_str` is available and attempts to book it if it is. If
-    the booking fails, the attempts resume.
+    Continuously checks if the time slot with the given `slot_str` is
+    available and attempts to book it if it is. If the booking fails, the
+    attempts resume.
+
+    Checks take place roughly every `interval` seconds, but are scheduled more
+    tightly around the slot's start time and the opening of its booking window,
+    and less frequently while the schedule remains unchanged.
 
     `start_str` and `end_str` determine the time range within which the search
     takes place.
+
+    If a `daemon_socket` is given, the schedule is obtained from the watch
+    daemon listening on that socket instead, for as long as it is reachable.
+    Otherwise, the schedule is polled by the given number of `workers`, each
+    over a connection of its own, which take turns so that checks take place
+    `workers` times as often while each connection is used equally often.
+
+    If given, `after_booking` is called with the authenticated session right
+    after this call booked the slot, but not if it had been booked already.
+
+    `fallbacks` is a list of `Candidate`s in the same category to book
+    instead, in order of preference, if the slot itself isn't available. All
+    of them are watched with the same polls, and whichever is the best
+    bookable one is booked, after which watching stops. Fallbacks on other
+    days than the slot are only seen when not using the watch daemon.
     """
     print(f"Checking availability for gym slot at {slot_str}.")
 
-    prev_time = time.time()
+    candidates = [Candidate(slot_str, subcategory_id)] + (fallbacks or [])
+    ranking = CandidateRanking(candidates)
+    start_str = min([start_str] + [c.slot_str for c in candidates])
+    end_str = max(
+        [end_str] + [shift_time_slot_str(c.slot_str, 3600) for c in candidates]
+    )
+    earliest = min(c.slot_str for c in candidates)
+
+    booking_window = get_booking_window(BookingTagId(tag_id))
+    product_ids = None
+    if None not in ranking.subcategory_ids:
+        product_ids = sorted(ranking.subcategory_ids)
+    scheduler = PollScheduler(
+        seconds_until(earliest), booking_window,
+        base_interval=interval / workers, min_interval=0.5 / workers,
+        max_interval=10 / workers,
+        profile=cancellation_profile(tag_id, int(slot_str[11:13]))
+    )
+    events = ScheduleEvents(tag_id, booking_window)
+    store = events.store
+
+    warm_up()
+
+    # Authenticate ahead of time so a free slot can be booked right away
+    auth_session = AuthSession(username, passw, auth_method)
+    auth_session.start_refreshing()
+
+    (updates, pool) = (None, None)
+    if daemon_socket is not None:
+        updates = subscribe_schedule(tag_id, slot_str[:10], daemon_socket)
+    elif workers > 1:
+        pool = PollerPool(
+            lambda session: booking_schedule(
+                start_str, end_str, tag_id, product_ids, session=session
+            ),
+            scheduler, workers
+        )
+        updates = pool
+
+    retry = False
     while True:
-        t = time.time()
-        if t - prev_time < interval:
-            continue
-
-        prev_time = t  # Update time regardless of rest of loop
+        polled = updates is None
+        if not polled:
+            try:
+                slots = next(updates)
+            except (OSError, StopIteration) as e:
+                print(f"[!] Lost watch daemon ({e}). Polling directly.")
+                updates = None
+                continue
+        else:
+            scheduler.wait()
+            slots = booking_schedule(start_str, end_str, tag_id, product_ids)
 
-        slots = booking_schedule(start_str, end_str, tag_id)
         if slots is None:
+            scheduler.record_poll(changed=False)
+            scheduler.postpone(SCHEDULE_POLICY.blocked_for())
             continue
 
-        slot = find_slot(slot_str, slots, ignore_availability=False,
-                         subcategory_id=subcategory_id)
-        if not slot_is_bookable(slot):
+        changes = events.feed(slots)
+        if polled:
+            scheduler.record_poll(changed=bool(changes))
+
+        if not ranking.found_in(store):
+            print(f"Could not find a slot starting at {slot_str}. Exiting.")
+            exit(0)
+
+        # Only changes to the candidates' slots can make one bookable
+        slot_changes = [
+            event for event in changes if ranking.rank(event.slot) is not None
+        ]
+        for event in slot_changes:
+            if event.type in NOTIFIED_EVENTS:
+                print(f"Slot at {event.slot.start_str}: "
+                      f"{NOTIFIED_EVENTS[event.type]}.")
+        if not slot_changes and not retry:
             continue
 
-        (session, token, mem_id_from_auth) = auth(username, passw, auth_method)
-        if mem_id_from_auth is not None:
-            member_id = mem_id_from_auth
-        booked = book_slot(slot, member_id, session, token)
+        # The slots' product knows when their booking window actually opens
+        if slot_changes:
+            product_window = get_booking_window(
+                BookingTagId(tag_id), slot_changes[0].slot.linked_product_id
+            )
+            if product_window != booking_window:
+                booking_window = product_window
+                scheduler.set_booking_window(booking_window)
+                events.set_booking_window(booking_window)
+
+        # Every candidate is evaluated in a single pass over the schedule
+        (rank, slot) = ranking.best(
+            store.tag_slots(tag_id),
+            lambda s: store.is_bookable(s, booking_window)
+        )
+        if slot is None:
+            # Keep checking available slots until their window opens, rather
+            # than relying on a single event
+            (_, waiting) = ranking.best(
+                store.tag_slots(tag_id),
+                lambda s: store.is_bookable(s, float("inf"))
+            )
+            retry = waiting is not None
+            continue
+
+        (result, session) = book_authenticated(
+            slot.as_dict(), member_id, auth_session
+        )
+        booked = result in (BookingResult.BOOKED, BookingResult.ALREADY_BOOKED)
 
+        # The slot may stay available without any further changes
+        retry = not booked
         if not booked:
-            print(f"Failed to book slot at {slot_str}. Resuming attempts.")
+            print(f"Failed to book slot at {slot.start_str}. "
+                  f"Resuming attempts.")
             continue
 
-        print(f"Succesfully booked slot at {slot_str} (UTC)!")
+        if result == BookingResult.ALREADY_BOOKED:
+            print(f"Slot at {slot.start_str} was already booked. Exiting.")
+            auth_session.close()
+            if pool is not None:
+                pool.close()
+            break
+
+        if after_booking is not None:
+            after_booking(session)
+
+        if rank > 0:
+            print(f"Booked fallback {rank} instead of the slot at "
+                  f"{slot_str}.")
+        print(f"Succesfully booked slot at {slot.start_str} (UTC)!")
         print(f"Terminating session and exiting.")
-        terminate_session(session)
+        auth_session.close()
+        if pool is not None:
+            pool.close()
         break
 
 
-def booking_schedule(start_str, end_str, tag_id=BookingTagId.GYM.value):
+def booking_schedule(start_str, end_str, tag_id=BookingTagId.GYM.value,
+                     product_ids=None, session=None):
     """
     Obtains the list of available bookings between the given `start_str` and
     `end_str` datetimes, which should be formatted as
     "YYYY-MM-DDTHH:00:00.000Z", e.g., 2022-03-07T15:00:00.000Z for 7 March,
-    2022, 15:00.
+    2022, 15:00. If `product_ids` are given, only slots for those
+    subcategories are obtained.
 
     Note that X's backend stores timestamps in UTC (GMT+0), so any requests
     with time-related parameters should be formatted as such.
+
+    Only the fields required for booking are requested, and the previous
+    response is reused if the backend reports that it has not changed. The
+    request is sent with the given `session`, or with the shared session if
+    there is none.
     """
-    now_str = datetime.today().strftime("%Y-%m-%dT%H:%M:%S")
-    url = f"https://backbone-web-api.production.delft.delcom.nl/bookable-s" + \
-          f"lots?s=%7B%22startDate%22:%22{start_str}%22,%22endDate%22" + \
-          f":%22{end_str}%22,%22tagIds%22:%7B%22$in%22:%5B{tag_id}%5D%7D,%" + \
-          f"22availableFromDate%22:%7B%22$gt%22:%22{now_str}%22%7D,%22" + \
-          f"availableTillDate%22:%7B%22$gte%22:%22{now_str}%22%7D%7D"
+    url = bookable_slots_url(start_str, end_str, [tag_id], product_ids)
+
+    return _fetch_schedule(url, session)
+
+
+def batched_booking_schedule(targets):
+    """
+    Obtains the slots of all given `targets` with as few requests as
+    possible, regardless of their categories and days.
+
+    Returns a dictionary that maps each of the targets' tag IDs to the slots
+    obtained for that category, or `None` if any of the requests failed.
+    Responses are split by category while they are still coming in.
+    """
+    slots_by_tag = {}
+    for query in plan_queries(targets):
+        url = query_url(query)
+        query_slots = _fetch_schedule(
+            url, collect=lambda slots: demultiplex(query, slots),
+            cache_key=(url, "by_tag")
+        )
+        if query_slots is None:
+            return None
+
+        for (tag_id, tag_slots) in query_slots.items():
+            slots_by_tag.setdefault(tag_id, []).extend(tag_slots)
+
+    return slots_by_tag
+
+
+def _fetch_schedule(url, session=None, collect=list, cache_key=None,
+                    chunk_size=16384):
+    """
+    Requests the schedule at `url` and returns the result of passing its
+    slots to `collect` while the response is being parsed incrementally, or
+    `None` if the request fails. The result is cached under `cache_key`, or
+    the `url` if there is none, and reused if the backend reports that the
+    schedule has not changed.
+    """
+    increment("xbook_schedule_polls_total")
+
+    cache_key = url if cache_key is None else cache_key
+    headers = {}
+    (etag, cached_data) = _schedule_cache.get(cache_key, (None, None))
+    if etag is not None:
+        headers["if-none-match"] = etag
 
     try:
-        data = json.loads(requests.get(url).text)["data"]
+        r = SCHEDULE_POLICY.call(
+            timed_request, "booking_schedule",
+            (session or shared_session()).get, url, headers=headers,
+            stream=True, timeout=SCHEDULE_TIMEOUT
+        )
+        try:
+            if r.status_code == 304:
+                return cached_data
+
+            r.raise_for_status()
+            data = collect(_iter_slots(r, chunk_size))
+        finally:
+            r.close()
+    except CircuitOpenError:
+        return None
     except Exception as e:
         print(e)
         return None
 
+    if "etag" in r.headers:
+        if len(_schedule_cache) >= 64:
+            _schedule_cache.clear()
+        _schedule_cache[cache_key] = (r.headers["etag"], data)
+
     return data
 
 
+def stream_booking_schedule(start_str, end_str, tag_id=BookingTagId.GYM.value,
+                            product_ids=None, chunk_size=16384):
+    """
+    Obtains the same slots as `booking_schedule`, but yields them one by one
+    while the response is still coming in, without holding the entire
+    response in memory.
+
+    Raises an exception if the request fails, e.g., `CircuitOpenError` if
+    schedule requests are currently suspended, and closes the response as
+    soon as iteration stops.
+    """
+    url = bookable_slots_url(start_str, end_str, [tag_id], product_ids)
+    increment("xbook_schedule_polls_total")
+
+    r = SCHEDULE_POLICY.call(
+        timed_request, "stream_booking_schedule", shared_session().get, url,
+        stream=True, timeout=SCHEDULE_TIMEOUT
+    )
+    try:
+        r.raise_for_status()
+        yield from _iter_slots(r, chunk_size)
+    finally:
+        r.close()
+
+
+def _iter_slots(r, chunk_size):
+    # Slots are parsed as soon as they arrive, so only the slots themselves
+    # are held in memory rather than the entire response as well
+    decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")()
+    chunks = (
+        decoder.decode(chunk)
+        for chunk in r.iter_content(chunk_size=chunk_size)
+    )
+    return JsonArrayStream(chunks, key="data")
+
+
 def find_slot(time_slot_str, slots, ignore_availability=False,
               subcategory_id=None):
     """
@@ -125,7 +396,7 @@ def slot_match(slot, time_slot_str, subcategory_id=None):
     by the given start time and category information.
     """
     return slot["startDate"] == time_slot_str and \
-        subcategory_id is None or slot["bookableProductId"] == subcategory_id
+        (subcategory_id is None or slot["bookableProductId"] == subcategory_id)
 
 
 def slot_is_bookable(slot, booking_tag_id=BookingTagId.GYM):
@@ -134,32 +405,112 @@ def slot_is_bookable(slot, booking_tag_id=BookingTagId.GYM):
     availability and the remaining time until participants can start attempting
     to book.
     """
-    seconds_until_slot = seconds_diff(datetime.utcnow(), slot["startDate"])
+    seconds_until_slot = seconds_until(slot["startDate"])
 
-    booking_window = get_booking_window(booking_tag_id)
+    booking_window = get_booking_window(
+        booking_tag_id, slot.get("linkedProductId")
+    )
     slot_within_booking_window = seconds_until_slot < booking_window
 
     return slot["isAvailable"] and slot_within_booking_window
 
 
-def get_booking_window(booking_tag_id=BookingTagId.GYM):
+def get_booking_window(booking_tag_id=BookingTagId.GYM, product_id=None):
     """
     Returns the number of seconds that X allows between the booking time and
-    start time for a time slot of the given `booking_tag_id`.
+    start time for a time slot of the given `booking_tag_id` and, if known,
+    linked `product_id`.
+
+    The window is taken from the product's metadata if possible, and from the
+    window last discovered for the category or the hardcoded windows
+    otherwise.
     """
+    if product_id is not None:
+        window = product_booking_window(product_id, booking_tag_id.value)
+        if window is not None:
+            return window
+
+    window = tag_booking_window(booking_tag_id.value)
+    if window is not None:
+        return window
+
     # Assume an unreasonably large window by default for unknown categories
     return BOOKING_TAG_ID_BOOKING_WINDOW_MAP.get(booking_tag_id, 31536000)
 
 
+def discover_booking_window(slot_str, tag_id, subcategory_id=None):
+    """
+    Returns the booking window of the slot starting at the given `slot_str`
+    by looking up the slot's product, falling back to the window of its
+    category if the slot can't be found.
+    """
+    slot_end = shift_time_slot_str(slot_str, 3600)
+    product_ids = [subcategory_id] if subcategory_id is not None else None
+
+    slots = booking_schedule(slot_str, slot_end, tag_id, product_ids) or []
+    slot = find_slot(slot_str, slots, ignore_availability=True,
+                     subcategory_id=subcategory_id)
+    product_id = slot["linkedProductId"] if slot is not None else None
+
+    return get_booking_window(BookingTagId(tag_id), product_id)
+
+
 def book_slot(slot, member_id, session, token=None):
     """
     Books the fitness time `slot` for the user with the given `member_id`.
 
-    Returns whether or not the booking was successful.
+    Returns whether or not the booking was successful, which includes the
+    slot having been booked for this user already.
     """
+    result = try_book_slot(slot, member_id, session, token)
+
+    return result in (BookingResult.BOOKED, BookingResult.ALREADY_BOOKED)
+
+
+def book_authenticated(slot, member_id, auth_session):
+    """
+    Attempts to book the time `slot` with the session of the given
+    `AuthSession` and returns a `(BookingResult, session)` tuple. The member
+    ID obtained while authenticating takes precedence over `member_id`.
+
+    If X rejects the session's token, e.g., because a cached token was
+    revoked, the session authenticates again, which replaces the cached
+    token, and the booking is attempted once more.
+    """
+    for attempt in range(2):
+        (session, token, mem_id_from_auth) = auth_session.get()
+        if mem_id_from_auth is not None:
+            member_id = mem_id_from_auth
+
+        result = try_book_slot(slot, member_id, session, token)
+        if result != BookingResult.UNAUTHORIZED or attempt > 0:
+            break
+
+        print("[!] Authentication was rejected. Authenticating again.")
+        try:
+            auth_session.refresh()
+        except Exception as e:
+            print(f"[!] Failed to authenticate again: {e}")
+            break
+
+    return (result, session)
+
+
+def try_book_slot(slot, member_id, session, token=None):
+    """
+    Attempts to book the time `slot` for the user with the given `member_id`
+    and returns the `BookingResult`.
+
+    A slot that has been booked for this user by this process isn't requested
+    again, to prevent duplicate bookings.
+    """
+    key = (member_id, slot["startDate"], slot["bookableProductId"])
+    if key in _booked_slots:
+        return BookingResult.ALREADY_BOOKED
+
     print("Attempting to book slot...")
 
-    url = "https://backbone-web-api.production.delft.delcom.nl/participations"
+    url = f"{API_URL}/participations"
     payload = {
         # "organizationId": null,
         "memberId": member_id,
@@ -182,9 +533,47 @@ def book_slot(slot, member_id, session, token=None):
     }
 
     session.headers["authorization"] = f"Bearer {token}"
-    r = session.post(url, json=payload)
+    try:
+        r = BOOKING_POLICY.call(
+            timed_request, "book_slot", session.post, url, json=payload,
+            timeout=BOOKING_TIMEOUT
+        )
+        result = classify_booking_response(r)
+    except Exception as e:
+        print(e)
+        result = BookingResult.FAILED
 
-    return r.status_code < 300
+    if result in (BookingResult.BOOKED, BookingResult.ALREADY_BOOKED):
+        _booked_slots.add(key)
+    increment("xbook_booking_attempts_total", result=result.name.lower())
+
+    return result
+
+
+def classify_booking_response(r):
+    """
+    Returns the `BookingResult` that corresponds to the response `r` to a
+    booking request. Rejections because the slot is full or already booked by
+    the user are told apart from other failures by their message, so that a
+    rejection only counts as already booked if its message says so.
+
+    Only a 401 means the token was rejected; a 403 forbids this particular
+    booking, which authenticating again doesn't change.
+    """
+    if r.status_code < 300:
+        return BookingResult.BOOKED
+    if r.status_code == 401:
+        return BookingResult.UNAUTHORIZED
+    if r.status_code >= 500 or r.status_code == 429:
+        return BookingResult.FAILED
+
+    message = r.text.lower()
+    if any(phrase in message for phrase in ALREADY_BOOKED_MESSAGES):
+        return BookingResult.ALREADY_BOOKED
+    if any(word in message for word in FULL_MESSAGES):
+        return BookingResult.FULL
+
+    return BookingResult.FAILED
 
 
 def cancel_slot(slot_id, session):
@@ -195,7 +584,10 @@ def cancel_slot(slot_id, session):
 
     Returns whether the booking was successfully cancelled.
     """
-    url = f"https://backbone-web-api.production.delft.delcom.nl/participations/{slot_id}"
-    r = session.delete(url)
+    url = f"{API_URL}/participations/{slot_id}"
+    r = BOOKING_POLICY.call(
+        timed_request, "cancel_slot", session.delete, url,
+        timeout=BOOKING_TIMEOUT
+    )
 
     return r.ok
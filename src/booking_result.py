@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class BookingResult(Enum):
+    BOOKED = 0
+    ALREADY_BOOKED = 1
+    FULL = 2
+    FAILED = 3
+    UNAUTHORIZED = 4
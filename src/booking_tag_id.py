@@ -1,6 +1,6 @@
 from enum import Enum
 
-from fuzzywuzzy import process
+from aliases import build_alias_table, resolve_alias
 
 
 class BookingTagId(Enum):
@@ -33,13 +33,19 @@ class BookingTagId(Enum):
     def from_string(s):
         """
         Constructs and returns a booking tag ID from the given category string
-        `s` by fuzzy searching for the best match.
+        `s` by looking it up in a table of aliases, or by fuzzy searching for
+        the best match if there is no matching alias.
 
         >>> BookingTagId.from_string("gYm")
         <BookingTagId.GYM: 28>
         >>> BookingTagId.from_string("beach")
         <BookingTagId.BEACH_VOLLEYBALL_COURT: 88>
         """
+        match = resolve_alias(s, BOOKING_TAG_ID_ALIAS_TABLE)
+        if match is not None:
+            return match
+
+        from fuzzywuzzy import process
         match, _ = process.extractOne(s, BOOKING_TAG_ID_STRING_MAP.keys())
         return BOOKING_TAG_ID_STRING_MAP[match]
 
@@ -50,6 +56,8 @@ BOOKING_TAG_ID_STRING_MAP = {
     in list(BookingTagId)
 }
 
+BOOKING_TAG_ID_ALIAS_TABLE = build_alias_table(list(BookingTagId))
+
 
 # Contains constant time windows for booking tag IDs. If a category is not
 # present in the map, it either has an unknown value or has to be computed at
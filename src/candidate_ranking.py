@@ -0,0 +1,53 @@
+class CandidateRanking:
+    """
+    Ranks slots by the first of the given `candidates` that they match, so
+    that a lower rank is preferred. Matching a slot is a dictionary lookup,
+    however many candidates there are.
+    """
+
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.subcategory_ids = {c.subcategory_id for c in candidates}
+
+        self._ranks = {}
+        for (rank, candidate) in enumerate(candidates):
+            key = (candidate.slot_str, candidate.subcategory_id)
+            self._ranks.setdefault(key, rank)
+
+    def rank(self, slot):
+        """
+        Returns the rank of the given `Slot`, or `None` if it matches none of
+        the candidates.
+        """
+        exact = self._ranks.get((slot.start_str, slot.product_id))
+        wildcard = self._ranks.get((slot.start_str, None))
+        if exact is None or wildcard is None:
+            return wildcard if exact is None else exact
+
+        return min(exact, wildcard)
+
+    def best(self, slots, is_bookable):
+        """
+        Returns a `(rank, slot)` tuple for the best-ranked slot among `slots`
+        for which `is_bookable` holds, or `(None, None)` if there is none.
+        Every slot is looked at once.
+        """
+        (best_rank, best_slot) = (None, None)
+        for slot in slots:
+            rank = self.rank(slot)
+            if rank is None or best_rank is not None and rank >= best_rank:
+                continue
+            if is_bookable(slot):
+                (best_rank, best_slot) = (rank, slot)
+
+        return (best_rank, best_slot)
+
+    def found_in(self, store):
+        """
+        Returns whether any candidate's slot is part of the given
+        `SlotStore`.
+        """
+        return any(
+            store.find(c.slot_str, c.subcategory_id) is not None
+            for c in self.candidates
+        )
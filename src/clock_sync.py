@@ -0,0 +1,63 @@
+from email.utils import parsedate_to_datetime
+import time
+
+from constants import API_URL
+from http_client import shared_session
+
+
+def measure_clock_offset(samples=8, url=API_URL):
+    """
+    Estimates the offset in seconds between the server's clock and the local
+    clock based on the `Date` headers of `samples` requests to `url`.
+
+    Returns an `(offset, uncertainty)` tuple, such that the server's time is
+    approximately `time.time() + offset`, give or take `uncertainty` seconds.
+
+    `Date` headers only have a resolution of one second, so each response only
+    bounds the offset to an interval. Samples are spread over fractions of a
+    second, so the intersection of these intervals becomes a lot narrower.
+    """
+    (lower, upper) = (float("-inf"), float("inf"))
+
+    s = shared_session()
+    s.head(url, timeout=5)  # Make sure the connection is open
+
+    for i in range(samples):
+        t_sent = time.time()
+        r = s.head(url, timeout=5)
+        t_received = time.time()
+
+        server_second = parsedate_to_datetime(r.headers["date"]).timestamp()
+
+        # The server's clock read `server_second` somewhere during the request
+        lower = max(lower, server_second - t_received)
+        upper = min(upper, server_second + 1 - t_sent)
+
+        # Shift the next sample to a different fraction of a second
+        time.sleep(1 + 1 / (samples + 1))
+
+    if lower > upper:
+        # Samples contradicted each other, e.g., because the clock was adjusted
+        return ((lower + upper) / 2, abs(lower - upper))
+
+    return ((lower + upper) / 2, (upper - lower) / 2)
+
+
+def sleep_until(target, coarse_margin=0.5):
+    """
+    Sleeps until the local clock reaches the UNIX timestamp `target`.
+
+    The bulk of the time is spent in a single sleep, after which ever smaller
+    sleeps bring the wake-up time within about a millisecond of `target`.
+    """
+    remaining = target - time.time()
+    if remaining > coarse_margin:
+        time.sleep(remaining - coarse_margin)
+
+    remaining = target - time.time()
+    while remaining > 0.001:
+        time.sleep(remaining / 2)
+        remaining = target - time.time()
+
+    while time.time() < target:
+        pass
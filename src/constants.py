@@ -1,3 +1,5 @@
+import os
+
 BEACH_VOLLEYBALL_COURT_PRODUCT_IDS = {
     1: 36,
     2: 37,
@@ -11,3 +13,12 @@ HALL_PRODUCT_IDS = {
     "X3A": 16534, # bookableLinkedProductId might be 20047 for X3
     "X3B": 16533
 }
+
+# Both can be overridden through the environment, e.g., to run xbook against a
+# local stand-in for X's backend
+API_URL = os.environ.get(
+    "XBOOK_API_URL", "https://backbone-web-api.production.delft.delcom.nl"
+)
+CACHE_DIR = os.environ.get(
+    "XBOOK_CACHE_DIR", os.path.expanduser("~/.cache/xbook")
+)
@@ -0,0 +1,26 @@
+import json
+import os
+import socket
+
+from constants import CACHE_DIR
+
+
+DAEMON_SOCKET_PATH = os.path.join(CACHE_DIR, "xbookd.sock")
+
+
+def subscribe_schedule(tag_id, date, socket_path=DAEMON_SOCKET_PATH):
+    """
+    Subscribes to the schedule for the given `tag_id` on the given `date` (in
+    UTC, formatted as YYYY-MM-DD) at the daemon listening on `socket_path`.
+
+    Yields each list of slots the daemon publishes and stops when the daemon
+    disconnects.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        request = json.dumps({"tag_id": tag_id, "date": date})
+        sock.sendall(f"{request}\n".encode())
+
+        with sock.makefile("r") as f:
+            for line in f:
+                yield json.loads(line)["slots"]
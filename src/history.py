@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+
+from constants import CACHE_DIR
+from slot_store import SlotEventType
+
+
+HISTORY_PATH = os.path.join(CACHE_DIR, "history.sqlite3")
+
+# Only availability changes are recorded, as they are what polling is for
+RECORDED_EVENTS = (SlotEventType.FREED, SlotEventType.FILLED)
+
+_recorder = None
+
+
+class HistoryRecorder:
+    """
+    Appends availability changes of slots to an SQLite database at `path`,
+    one row per change, so it stays small even when polling all day.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        import sqlite3
+
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS slot_events ("
+            "observed_at REAL, tag_id INTEGER, product_id INTEGER, "
+            "slot_start INTEGER, event INTEGER)"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS slot_events_tag "
+            "ON slot_events (tag_id, event)"
+        )
+        self._lock = threading.Lock()
+
+    def record(self, tag_id, events, now=None):
+        """
+        Stores the recorded types among the given slot `events` of the
+        category with the given `tag_id`, observed at UNIX timestamp `now`.
+        """
+        now = time.time() if now is None else now
+        rows = [
+            (now, tag_id, event.slot.product_id, event.slot.start,
+             event.type.value)
+            for event in events if event.type in RECORDED_EVENTS
+        ]
+        if not rows:
+            return
+
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT INTO slot_events VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def close(self):
+        self.db.close()
+
+
+class CancellationProfile:
+    """
+    The relative likelihood of a slot being freed as a function of the time
+    left until it starts, learned from recorded history in buckets of an
+    hour. Weights average to 1 over the observed range.
+    """
+
+    def __init__(self, counts):
+        # Add-one smoothing keeps unobserved hours from being ignored entirely
+        smoothed = [count + 1 for count in counts]
+        mean = sum(smoothed) / len(smoothed)
+        self.weights = [count / mean for count in smoothed]
+
+    def weight(self, seconds_until_slot):
+        """
+        Returns how likely a cancellation is `seconds_until_slot` seconds
+        before the slot starts, relative to the average.
+        """
+        bucket = int(seconds_until_slot // 3600)
+        if bucket < 0 or bucket >= len(self.weights):
+            return 1
+
+        return self.weights[bucket]
+
+
+def record_history(path=HISTORY_PATH):
+    """
+    Starts recording the availability changes seen by all watchers in this
+    process to the database at `path`.
+    """
+    global _recorder
+    _recorder = HistoryRecorder(path)
+
+
+def recording():
+    """
+    Returns whether availability changes are being recorded.
+    """
+    return _recorder is not None
+
+
+def record(tag_id, events, now=None):
+    """
+    Records the given slot `events` of the category with the given `tag_id`
+    if recording is enabled.
+    """
+    if _recorder is not None:
+        _recorder.record(tag_id, events, now)
+
+
+def cancellation_profile(tag_id, slot_hour=None, path=HISTORY_PATH,
+                         min_events=20):
+    """
+    Returns the `CancellationProfile` of the category with the given
+    `tag_id`, preferably for slots starting at the given UTC `slot_hour`.
+    Returns `None` if fewer than `min_events` cancellations were recorded.
+    """
+    if not os.path.exists(path):
+        return None
+
+    import sqlite3
+
+    db = sqlite3.connect(path)
+    try:
+        query = "SELECT CAST((slot_start - observed_at) / 3600 AS INTEGER) " \
+            "AS bucket, COUNT(*) FROM slot_events " \
+            "WHERE tag_id = ? AND event = ? AND slot_start > observed_at"
+        params = (tag_id, SlotEventType.FREED.value)
+
+        rows = []
+        if slot_hour is not None:
+            rows = db.execute(
+                f"{query} AND slot_start % 86400 / 3600 = ? GROUP BY bucket",
+                params + (slot_hour,)
+            ).fetchall()
+        if sum(count for (_, count) in rows) < min_events:
+            rows = db.execute(f"{query} GROUP BY bucket", params).fetchall()
+    except sqlite3.Error as e:
+        print(f"[!] Could not read availability history: {e}")
+        return None
+    finally:
+        db.close()
+
+    if sum(count for (_, count) in rows) < min_events:
+        return None
+
+    counts = [0] * (max(bucket for (bucket, _) in rows) + 1)
+    for (bucket, count) in rows:
+        counts[bucket] = count
+
+    return CancellationProfile(counts)
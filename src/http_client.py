@@ -0,0 +1,81 @@
+import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+
+from constants import API_URL
+from metrics import timed_request
+
+
+# The certificate for x.tudelft.nl is untrusted, which produces many warnings
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# A single adapter owns the connection pools, so every session mounted with it
+# reuses the same keep-alive connections regardless of its cookies or headers
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+_shared_session = None
+
+# (connect, read) timeouts in seconds, so a stalled request fails and can be
+# retried instead of blocking forever. Schedules may take a while to stream
+# and the SSO login goes through slow third-party hosts.
+SCHEDULE_TIMEOUT = (3.05, 15)
+BOOKING_TIMEOUT = (3.05, 10)
+AUTH_TIMEOUT = (3.05, 20)
+
+
+class _Session(requests.Session):
+    """
+    A session whose `close` leaves the shared connection pool open, as other
+    sessions keep using its connections.
+    """
+
+    def close(self):
+        for adapter in set(self.adapters.values()):
+            if adapter is not _adapter:
+                adapter.close()
+
+
+def new_session(adapter=None):
+    """
+    Creates a session with its own cookies and headers that sends its requests
+    over the shared connection pool, or over the given `adapter`'s. Closing
+    the session only closes the connections of an `adapter` of its own.
+    """
+    adapter = adapter or _adapter
+
+    s = _Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers["accept-encoding"] = "gzip, deflate"
+    s.headers["connection"] = "keep-alive"
+
+    return s
+
+
+def dedicated_session():
+    """
+    Creates a session that sends its requests over a single connection of its
+    own, e.g., to spread requests over several connections on purpose.
+    """
+    return new_session(HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+
+def shared_session():
+    """
+    Returns the session used for unauthenticated requests to X's backend.
+    """
+    global _shared_session
+    if _shared_session is None:
+        _shared_session = new_session()
+
+    return _shared_session
+
+
+def warm_up(url=API_URL):
+    """
+    Opens a connection to the host of the given `url` ahead of time, so later
+    requests don't have to wait for the TCP and TLS handshakes.
+    """
+    try:
+        timed_request("warm_up", shared_session().head, url, timeout=5)
+    except requests.RequestException as e:
+        print(f"[!] Failed to warm up connection to {url}: {e}")
@@ -0,0 +1,103 @@
+import json
+
+
+class JsonArrayStream:
+    """
+    Incrementally parses a JSON document from an iterable of text `chunks` and
+    yields the items of the array stored under the top-level `key`, or of the
+    top-level array itself, as soon as each of them has arrived.
+
+    Only the item that is currently being parsed is held in memory, so memory
+    usage doesn't depend on the size of the document.
+    """
+
+    def __init__(self, chunks, key="data"):
+        self.chunks = iter(chunks)
+        self.key = key
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def __iter__(self):
+        first = self._peek()
+        if first == "[":
+            self.pos += 1
+            yield from self._items()
+            return
+
+        self._expect("{")
+        while self._peek() != "}":
+            if self._peek() == ",":
+                self.pos += 1
+
+            key = self._value()
+            self._expect(":")
+            if key == self.key:
+                self._expect("[")
+                yield from self._items()
+            else:
+                self._value()
+
+    def _items(self):
+        while True:
+            c = self._peek()
+            if c == "]":
+                self.pos += 1
+                return
+            if c == ",":
+                self.pos += 1
+
+            yield self._value()
+
+    def _value(self):
+        """
+        Decodes and returns the next complete JSON value in the stream.
+        """
+        self._peek()
+        while True:
+            try:
+                (value, end) = self.decoder.raw_decode(self.buf, self.pos)
+
+                # A value at the very end of the buffer, e.g., a number, may
+                # continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            self._read()
+
+    def _peek(self):
+        """
+        Skips whitespace and returns the next character in the stream, or
+        `None` if the stream has ended.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos].isspace():
+                self.pos += 1
+
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return None
+
+            self._read()
+
+    def _expect(self, c):
+        if self._peek() != c:
+            raise ValueError(f"expected '{c}' at position {self.pos}")
+        self.pos += 1
+
+    def _read(self):
+        # Discard everything that has already been parsed
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+        else:
+            self.buf += chunk
@@ -0,0 +1,194 @@
+import atexit
+import bisect
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+
+# Upper bounds of the latency histograms' buckets in seconds
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")
+)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """
+    A latency histogram with fixed buckets that also tracks the number and sum
+    of its observations.
+    """
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+def increment(name, by=1, **labels):
+    """
+    Increments the counter with the given `name` and `labels`.
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + by
+
+
+def observe(name, seconds, **labels):
+    """
+    Adds an observation of `seconds` to the histogram with the given `name` and
+    `labels`.
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        if key not in _histograms:
+            _histograms[key] = Histogram()
+        _histograms[key].observe(seconds)
+
+
+def timed_request(phase, send, *args, **kwargs):
+    """
+    Sends an HTTP request by calling `send` with the given arguments, e.g.,
+    `session.get`, and records its latency and outcome under the given
+    `phase`. Returns the response.
+    """
+    start = time.perf_counter()
+    try:
+        r = send(*args, **kwargs)
+    except Exception:
+        increment("xbook_http_errors_total", phase=phase)
+        raise
+    finally:
+        observe("xbook_http_request_seconds", time.perf_counter() - start,
+                phase=phase)
+
+    increment("xbook_http_responses_total", phase=phase,
+              status=f"{r.status_code // 100}xx")
+
+    return r
+
+
+def to_json():
+    """
+    Returns all metrics as a JSON string.
+    """
+    with _lock:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for ((name, labels), value) in sorted(_counters.items())
+        ]
+        histograms = [
+            {
+                "name": name, "labels": dict(labels),
+                "buckets": dict(zip(map(str, LATENCY_BUCKETS), h.bucket_counts)),
+                "count": h.count, "sum": h.sum
+            }
+            for ((name, labels), h) in sorted(_histograms.items())
+        ]
+
+    return json.dumps({"counters": counters, "histograms": histograms})
+
+
+def to_prometheus():
+    """
+    Returns all metrics in Prometheus' text exposition format.
+    """
+    lines = []
+    typed = set()
+    with _lock:
+        for ((name, labels), value) in sorted(_counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for ((name, labels), h) in sorted(_histograms.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+
+            cumulative = 0
+            for (bound, count) in zip(LATENCY_BUCKETS, h.bucket_counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                bucket_labels = labels + (("le", le),)
+                lines.append(
+                    f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+                )
+            lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h.sum}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{k}="{v}"' for (k, v) in labels) + "}"
+
+
+def write_metrics(path):
+    """
+    Writes all metrics to the file at `path`, as JSON if it ends with ".json"
+    and in Prometheus' text format otherwise.
+    """
+    content = to_json() if path.endswith(".json") else to_prometheus()
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def export_to_file(path, interval=10):
+    """
+    Periodically writes all metrics to the file at `path` in a background
+    thread, as well as when the program exits.
+    """
+    def export_loop():
+        while True:
+            time.sleep(interval)
+            write_metrics(path)
+
+    threading.Thread(target=export_loop, daemon=True).start()
+    atexit.register(write_metrics, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            (body, content_type) = (to_prometheus(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            (body, content_type) = (to_json(), "application/json")
+        else:
+            self.send_error(404)
+            return
+
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    Serves all metrics on `/metrics` in Prometheus' text format and on
+    `/metrics.json` as JSON from a background thread.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
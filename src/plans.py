@@ -0,0 +1,158 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+import heapq
+import threading
+import time
+
+from booking import discover_booking_window
+from booking_tag_id import BookingTagId, BOOKING_TAG_ID_BOOKING_WINDOW_MAP
+from product_cache import tag_booking_window
+from targets import make_target
+from time_slot_manip import time_slot_str_to_epoch, x_timezone
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# A slot that recurs every week on the given `weekday`, where 0 is Monday, at
+# the given `hour` in X's timezone
+Plan = namedtuple("Plan", ["weekday", "hour", "category", "court"])
+
+
+def parse_plans(entries):
+    """
+    Parses the recurring plans in the given `entries` from config.json, which
+    are objects with "days" and an "hour" and optionally a "category" and
+    "court", e.g., `{"days": ["tue", "thu"], "hour": 17, "category": "gym"}`.
+    Every day of an entry becomes a plan of its own.
+    """
+    plans = []
+    for e in entries:
+        days = e["days"] if isinstance(e["days"], list) else [e["days"]]
+        for day in days:
+            weekday = str(day).lower()[:3]
+            if weekday not in WEEKDAYS:
+                raise ValueError(f"invalid day '{day}' in plan")
+
+            plans.append(Plan(
+                WEEKDAYS.index(weekday), int(e["hour"]),
+                e.get("category", "gym"), e.get("court")
+            ))
+
+    return plans
+
+
+def occurrences(plan, now=None):
+    """
+    Lazily yields a target for every occurrence of the given `plan` that
+    starts after the UNIX timestamp `now`, in chronological order.
+    """
+    now = time.time() if now is None else now
+    today = datetime.fromtimestamp(now, x_timezone()).date()
+    date = today + timedelta(days=(plan.weekday - today.weekday()) % 7)
+
+    while True:
+        target = make_target(
+            date.isoformat(), plan.hour, plan.category, plan.court
+        )
+        if time_slot_str_to_epoch(target.slot_str) > now:
+            yield target
+        date += timedelta(days=7)
+
+
+def window_openings(plans, now=None):
+    """
+    Lazily yields an `(opens_at, target)` tuple for every occurrence of the
+    given `plans` that starts after the UNIX timestamp `now`, ordered by the
+    UNIX timestamp `opens_at` at which the target's booking window opens.
+
+    Only the next occurrence of every plan is expanded at any time. If the
+    booking window of a plan's category is unknown, its occurrences open
+    right away, but only once the previous occurrence has started.
+    """
+    now = time.time() if now is None else now
+
+    heap = []
+    for (i, plan) in enumerate(plans):
+        upcoming = occurrences(plan, now)
+        target = next(upcoming)
+        heapq.heappush(heap, (_opens_at(target, now), i, target, upcoming))
+
+    while heap:
+        (opens_at, i, target, upcoming) = heapq.heappop(heap)
+        yield (opens_at, target)
+
+        previous_start = time_slot_str_to_epoch(target.slot_str)
+        target = next(upcoming)
+        heapq.heappush(
+            heap, (_opens_at(target, previous_start), i, target, upcoming)
+        )
+
+
+def run_plans(plans, username, passw, auth_method, member_id=None, lead=60,
+              max_sleep=600):
+    """
+    Books every occurrence of the given recurring `plans`, until interrupted.
+
+    Sleeps until `lead` seconds before the booking window of the next
+    occurrence opens, and only then starts watching it in a thread of its
+    own, which ends once the slot has been booked or has started. Occurrences
+    whose windows open at the same time are watched together.
+
+    Sleeps last at most `max_sleep` seconds, so waking up isn't delayed by
+    the machine having been suspended.
+    """
+    from watch_engine import watch_targets
+
+    openings = window_openings(plans)
+    (opens_at, target) = next(openings)
+    while True:
+        if opens_at - lead > time.time():
+            print(f"Next booking window opens in "
+                  f"{(opens_at - time.time()) / 3600:.1f} hours, for the slot "
+                  f"at {target.slot_str} (UTC).")
+            _sleep_until(opens_at - lead, max_sleep)
+
+        due = []
+        while opens_at - lead <= time.time():
+            due.append(target)
+            (opens_at, target) = next(openings)
+
+        print(f"Watching {len(due)} planned slot(s) starting at "
+              f"{', '.join(t.slot_str for t in due)} (UTC).")
+        threading.Thread(
+            target=watch_targets,
+            args=(due, username, passw, auth_method, member_id), daemon=True
+        ).start()
+
+
+def _opens_at(target, earliest):
+    window = booking_window(target)
+    if window is None:
+        return earliest
+
+    return time_slot_str_to_epoch(target.slot_str) - window
+
+
+def booking_window(target):
+    """
+    Returns the booking window of the category of the given `target`, which
+    is looked up through the target's product if it isn't known yet. Returns
+    `None` if the window remains unknown.
+    """
+    window = tag_booking_window(target.tag_id) or \
+        BOOKING_TAG_ID_BOOKING_WINDOW_MAP.get(BookingTagId(target.tag_id))
+    if window is not None:
+        return window
+
+    # Finding the target's product stores the window of its category
+    discover_booking_window(
+        target.slot_str, target.tag_id, target.subcategory_id
+    )
+    return tag_booking_window(target.tag_id)
+
+
+def _sleep_until(t, max_sleep):
+    remaining = t - time.time()
+    while remaining > 0:
+        time.sleep(min(remaining, max_sleep))
+        remaining = t - time.time()
@@ -0,0 +1,104 @@
+import time
+
+from metrics import increment
+
+
+class PollScheduler:
+    """
+    Decides when the next schedule poll should take place and sleeps until
+    then on the monotonic clock, so waiting watchers don't occupy the CPU.
+
+    The interval adapts to the situation: polls happen every `min_interval`
+    seconds close to the slot's start time and close to the moment its booking
+    window opens, and back off exponentially from `base_interval` up to
+    `max_interval` while consecutive polls don't observe any changes.
+
+    Given a `profile` of when slots tend to be freed, such as a
+    `history.CancellationProfile`, polls are moreover spread in proportion to
+    how likely a cancellation is at the time.
+    """
+
+    def __init__(self, seconds_until_slot, booking_window, base_interval=1,
+                 min_interval=0.5, max_interval=10, backoff_factor=1.5,
+                 urgency_margin=120, profile=None):
+        now = time.monotonic()
+        self.slot_start = now + seconds_until_slot
+        self.window_open = self.slot_start - booking_window
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.backoff_factor = backoff_factor
+        self.urgency_margin = urgency_margin
+        self.profile = profile
+
+        self.unchanged_polls = 0
+        self.next_poll = now
+
+    def wait(self):
+        """
+        Sleeps until the next poll is due. Returns immediately if it already
+        is.
+        """
+        remaining = self.delay()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def delay(self):
+        """
+        Returns the number of seconds until the next poll is due, which is
+        negative if it is overdue.
+        """
+        return self.next_poll - time.monotonic()
+
+    def record_poll(self, changed):
+        """
+        Registers the outcome of a poll that just took place and schedules the
+        next one. `changed` denotes whether the poll's result differed from
+        the previous result.
+        """
+        self.unchanged_polls = 0 if changed else self.unchanged_polls + 1
+        if changed:
+            increment("xbook_schedule_changes_total")
+
+        now = time.monotonic()
+        self.next_poll = now + self.interval(now)
+
+    def set_booking_window(self, booking_window):
+        """
+        Reschedules the next poll after the slot's `booking_window` turned out
+        to differ from the one this scheduler was created with.
+        """
+        self.window_open = self.slot_start - booking_window
+
+        now = time.monotonic()
+        self.next_poll = now + self.interval(now)
+
+    def postpone(self, seconds):
+        """
+        Makes sure the next poll doesn't take place within the given number of
+        `seconds`, e.g., because the backend asked to back off.
+        """
+        self.next_poll = max(self.next_poll, time.monotonic() + seconds)
+
+    def interval(self, now):
+        """
+        Computes the number of seconds to wait after a poll at monotonic time
+        `now`.
+        """
+        # There is no point in polling before the window opens, so sleep until
+        # shortly before it does
+        until_window = self.window_open - now
+        if until_window > self.urgency_margin:
+            return until_window - self.urgency_margin
+
+        near_window = abs(until_window) <= self.urgency_margin
+        near_start = abs(self.slot_start - now) <= self.urgency_margin
+        if near_window or near_start:
+            return self.min_interval
+
+        backed_off = self.base_interval * \
+            self.backoff_factor ** self.unchanged_polls
+        if self.profile is not None:
+            backed_off /= self.profile.weight(self.slot_start - now)
+
+        return min(max(backed_off, self.min_interval), self.max_interval)
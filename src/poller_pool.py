@@ -0,0 +1,96 @@
+import queue
+import threading
+
+from http_client import dedicated_session
+from metrics import increment
+from retry_policy import SCHEDULE_POLICY
+
+
+class PollerPool:
+    """
+    Polls a schedule with `workers` threads that each send their requests over
+    a connection of their own and take turns, so their polls are evenly
+    phase-offset. The `scheduler` decides when the next poll of the pool as a
+    whole is due, which means each worker only polls every `workers`
+    intervals.
+
+    Iterating over the pool yields the schedule of every poll that succeeded,
+    so the consumer sees time pass even while the schedule stays the same.
+    Results that arrive after the result of a later poll are dropped.
+    """
+
+    def __init__(self, fetch, scheduler, workers=2):
+        self.fetch = fetch
+        self.scheduler = scheduler
+
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._latest = -1
+        self._last_slots = None
+        self._changed = False
+
+        # Each worker holds at most one pending poll, so a slow connection
+        # skips its turn rather than falling behind
+        self._jobs = [queue.Queue(maxsize=1) for _ in range(workers)]
+        for jobs in self._jobs:
+            threading.Thread(target=self._work, args=(jobs,), daemon=True) \
+                .start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._results.get()
+
+    def close(self):
+        """
+        Stops polling.
+        """
+        self._stopped.set()
+
+    def _dispatch(self):
+        seq = 0
+        while not self._stopped.is_set():
+            # Wake up regularly, as the schedule may be changed meanwhile
+            delay = self.scheduler.delay()
+            if delay > 0:
+                self._stopped.wait(min(delay, 1))
+                continue
+
+            try:
+                self._jobs[seq % len(self._jobs)].put_nowait(seq)
+            except queue.Full:
+                increment("xbook_poller_skipped_turns_total")
+
+            with self._lock:
+                self.scheduler.record_poll(changed=self._changed)
+                self._changed = False
+            seq += 1
+
+    def _work(self, jobs):
+        session = dedicated_session()
+        while not self._stopped.is_set():
+            try:
+                seq = jobs.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            self._complete(seq, self.fetch(session))
+
+        session.close()
+
+    def _complete(self, seq, slots):
+        with self._lock:
+            if slots is None:
+                self.scheduler.postpone(SCHEDULE_POLICY.blocked_for())
+                return
+            if seq < self._latest:
+                return
+            self._latest = seq
+
+            if slots is not self._last_slots and slots != self._last_slots:
+                (self._last_slots, self._changed) = (slots, True)
+
+        self._results.put(slots)
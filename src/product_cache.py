@@ -0,0 +1,85 @@
+import os
+import time
+
+from constants import API_URL, CACHE_DIR
+from http_client import SCHEDULE_TIMEOUT, shared_session
+from metrics import timed_request
+from session_cache import load_cache, update_cache
+
+
+PRODUCT_CACHE_PATH = os.path.join(CACHE_DIR, "products.json")
+
+# Booking windows rarely change, so a day-old value is still trustworthy
+PRODUCT_CACHE_TTL = 86400
+
+# Products whose metadata was looked up in this process, including failed
+# lookups, so a failing endpoint isn't hit on every poll
+_product_windows = {}
+
+
+def product_booking_window(product_id, tag_id=None,
+                           cache_path=PRODUCT_CACHE_PATH,
+                           ttl=PRODUCT_CACHE_TTL):
+    """
+    Returns the number of seconds ahead of its start time that a slot of the
+    product with the given `product_id` can be booked, according to the
+    product's `bookableSlotsMinutesAhead` field, or `None` if it is unknown.
+
+    The value is fetched from X once and cached on disk for `ttl` seconds. If
+    the product belongs to the category with the given `tag_id`, the value is
+    cached for that category as well, so it is known before any of its slots
+    are.
+    """
+    if product_id in _product_windows:
+        return _product_windows[product_id]
+
+    key = f"product:{product_id}"
+    entry = load_cache(cache_path).get(key)
+    if entry is not None and time.time() - entry["fetched_at"] < ttl:
+        _product_windows[product_id] = entry["window"]
+        return entry["window"]
+
+    window = fetch_booking_window(product_id)
+    _product_windows[product_id] = window
+    if window is not None:
+        entry = {"window": window, "fetched_at": int(time.time())}
+        entries = {key: entry}
+        if tag_id is not None:
+            entries[f"tag:{tag_id}"] = entry
+        update_cache(cache_path, entries)
+
+    return window
+
+
+def fetch_booking_window(product_id):
+    """
+    Requests the metadata of the product with the given `product_id` from X
+    and returns its booking window in seconds, or `None` if the request fails
+    or the product doesn't specify one. Doesn't require authentication.
+    """
+    try:
+        r = timed_request(
+            "product", shared_session().get,
+            f"{API_URL}/products/{product_id}", timeout=SCHEDULE_TIMEOUT
+        )
+        r.raise_for_status()
+        minutes_ahead = r.json().get("bookableSlotsMinutesAhead")
+    except Exception as e:
+        print(f"[!] Could not obtain metadata of product {product_id}: {e}")
+        return None
+
+    return int(minutes_ahead) * 60 if minutes_ahead else None
+
+
+def tag_booking_window(tag_id, cache_path=PRODUCT_CACHE_PATH,
+                       ttl=PRODUCT_CACHE_TTL):
+    """
+    Returns the booking window last discovered for a product of the category
+    with the given `tag_id`, or `None` if there is no recent one.
+    """
+    entry = load_cache(cache_path).get(f"tag:{tag_id}")
+    if entry is None or time.time() - entry["fetched_at"] >= ttl:
+        return None
+
+    return entry["window"]
+
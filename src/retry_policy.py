@@ -0,0 +1,188 @@
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+import requests
+
+from metrics import increment
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a request is not sent because its circuit breaker is open.
+    """
+
+
+class RetryPolicy:
+    """
+    Retries failed requests of a single type with jittered exponential
+    backoff, and stops sending them altogether while the backend is failing.
+
+    Requests are retried on network errors, 5xx responses and 429 responses,
+    for which the `Retry-After` header is honoured. Retries are paid for from
+    a budget of `retry_budget` retries that refills over `budget_window`
+    seconds, so a failing backend doesn't receive more and more retries.
+
+    After `failure_threshold` consecutive failures, or a response that asks to
+    wait longer than `max_delay` seconds, the circuit breaker opens and
+    requests fail immediately for `reset_timeout` seconds or for as long as
+    the backend asked. A single trial request is then let through to decide
+    whether the circuit closes again.
+    """
+
+    def __init__(self, name, max_attempts=3, base_delay=0.5, max_delay=30,
+                 retry_budget=10, budget_window=60, failure_threshold=5,
+                 reset_timeout=30):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.budget_window = budget_window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.tokens = float(retry_budget)
+        self.tokens_updated = time.monotonic()
+        self.consecutive_failures = 0
+        self.open_until = 0
+        self.trial_in_progress = False
+        self._lock = threading.Lock()
+
+    def call(self, send, *args, **kwargs):
+        """
+        Sends a request by calling `send` with the given arguments and returns
+        its response, retrying it according to this policy.
+
+        Raises `CircuitOpenError` if the circuit breaker is open, or the last
+        exception raised by `send` if every attempt failed with one.
+        """
+        self._before_request()
+
+        for attempt in range(self.max_attempts):
+            try:
+                r = send(*args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                (r, error, delay) = (None, e, None)
+            except Exception:
+                # Anything else isn't retried, but must still end a trial
+                self._record_failure()
+                raise
+            else:
+                if not is_retryable(r):
+                    self._record_success()
+                    return r
+                (error, delay) = (None, retry_after(r))
+
+            self._record_failure(delay)
+            if attempt + 1 == self.max_attempts or \
+                    not self._take_retry_token() or \
+                    self.open_until > time.monotonic():
+                break
+
+            increment("xbook_retries_total", request_type=self.name)
+            time.sleep(self._backoff(attempt) if delay is None else delay)
+
+        if error is not None:
+            raise error
+        return r
+
+    def blocked_for(self):
+        """
+        Returns the number of seconds for which the circuit breaker will
+        remain open, or 0 if it is closed.
+        """
+        return max(self.open_until - time.monotonic(), 0)
+
+    def _before_request(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self.open_until:
+                raise CircuitOpenError(
+                    f"{self.name} requests are suspended for another "
+                    f"{self.open_until - now:.1f} seconds"
+                )
+
+            # Only let a single trial request through after the circuit opened
+            if self.consecutive_failures >= self.failure_threshold:
+                if self.trial_in_progress:
+                    raise CircuitOpenError(
+                        f"{self.name} requests await a trial request"
+                    )
+                self.trial_in_progress = True
+
+    def _record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.trial_in_progress = False
+
+    def _record_failure(self, retry_delay=None):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.trial_in_progress = False
+
+            open_for = None
+            if retry_delay is not None and retry_delay > self.max_delay:
+                open_for = retry_delay
+            elif self.consecutive_failures >= self.failure_threshold:
+                open_for = self.reset_timeout
+
+            if open_for is not None:
+                self.open_until = time.monotonic() + open_for
+                increment("xbook_circuit_opened_total", request_type=self.name)
+
+    def _take_retry_token(self):
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self.tokens_updated) * \
+                self.retry_budget / self.budget_window
+            self.tokens = min(self.tokens + refill, self.retry_budget)
+            self.tokens_updated = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+    def _backoff(self, attempt):
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt)
+        )
+
+
+def is_retryable(r):
+    """
+    Returns whether the request that resulted in response `r` should be
+    retried.
+    """
+    return r.status_code == 429 or r.status_code >= 500
+
+
+def retry_after(r):
+    """
+    Returns the number of seconds the backend asked to wait through the
+    `Retry-After` header of response `r`, or `None` if it didn't.
+    """
+    value = r.headers.get("retry-after")
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+# Each request type has its own retry budget and circuit breaker
+SCHEDULE_POLICY = RetryPolicy("schedule", max_attempts=2, base_delay=1)
+BOOKING_POLICY = RetryPolicy(
+    "booking", max_attempts=3, base_delay=0.2, max_delay=5, retry_budget=5,
+    failure_threshold=10, reset_timeout=10
+)
@@ -0,0 +1,99 @@
+import heapq
+import time
+
+import history
+from slot_store import SlotEvent, SlotEventType, SlotStore
+
+
+class ScheduleEvents:
+    """
+    Turns successive schedule polls for a single category into `SlotEvent`s,
+    so only the slots that changed have to be looked at.
+
+    Besides the changes reported by `SlotStore.apply`, a `WINDOW_OPENED`
+    event is emitted once for every slot whose booking window has opened,
+    which takes `booking_window` seconds before it starts.
+
+    Availability changes are recorded if history recording is enabled.
+    """
+
+    def __init__(self, tag_id, booking_window, store=None):
+        self.tag_id = tag_id
+        self.booking_window = booking_window
+        self.store = store if store is not None else SlotStore()
+
+        # Slots whose booking window hasn't opened yet, by opening time
+        self._closed = []
+        self._tracked = set()
+
+    def feed(self, raw_slots, now=None):
+        """
+        Processes the `raw_slots` of a poll that took place at UNIX timestamp
+        `now` and returns the resulting list of events.
+        """
+        now = time.time() if now is None else now
+
+        events = self.store.apply(raw_slots, self.tag_id)
+        history.record(self.tag_id, events, now)
+        for event in events:
+            slot = event.slot
+            if event.type == SlotEventType.ADDED and \
+                    id(slot) not in self._tracked and \
+                    slot.start - self.booking_window > now:
+                self._track(slot, now)
+
+        generation = self.store.generations.get(self.tag_id)
+        while self._closed and self._closed[0][0] <= now:
+            (_, _, slot) = heapq.heappop(self._closed)
+            self._tracked.discard(id(slot))
+            if slot.seen == generation:
+                events.append(SlotEvent(SlotEventType.WINDOW_OPENED, slot))
+
+        return events
+
+    def set_booking_window(self, booking_window, now=None):
+        """
+        Changes the booking window of the category. Windows that have already
+        opened according to the new one are reported by the next `feed`, and
+        known slots whose windows only open later according to the new one
+        are tracked again.
+        """
+        now = time.time() if now is None else now
+        self.booking_window = booking_window
+
+        slots = {id(slot): slot for (_, _, slot) in self._closed}
+        for slot in self.store.tag_slots(self.tag_id):
+            if slot.start - booking_window > now:
+                slots[id(slot)] = slot
+
+        (self._closed, self._tracked) = ([], set())
+        for slot in slots.values():
+            self._track(slot, now)
+
+    def _track(self, slot, now):
+        opens_at = max(slot.start - self.booking_window, now)
+        heapq.heappush(self._closed, (opens_at, id(slot), slot))
+        self._tracked.add(id(slot))
+
+
+def schedule_events(polls, tag_id, booking_window, store=None):
+    """
+    Yields the events of the successive schedule `polls` for the category
+    with the given `tag_id`. Polls that failed, i.e., are `None`, are
+    skipped.
+    """
+    events = ScheduleEvents(tag_id, booking_window, store)
+    for raw_slots in polls:
+        if raw_slots is not None:
+            yield from events.feed(raw_slots)
+
+
+async def async_schedule_events(polls, tag_id, booking_window, store=None):
+    """
+    Like `schedule_events`, but for an asynchronous iterable of `polls`.
+    """
+    events = ScheduleEvents(tag_id, booking_window, store)
+    async for raw_slots in polls:
+        if raw_slots is not None:
+            for event in events.feed(raw_slots):
+                yield event
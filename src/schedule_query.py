@@ -0,0 +1,131 @@
+from collections import namedtuple
+from datetime import datetime
+import json
+from urllib.parse import quote
+
+from constants import API_URL
+from time_slot_manip import shift_time_slot_str, time_slot_str_to_epoch
+
+
+# The slot fields used to match, check and book slots
+SLOT_FIELDS = (
+    "startDate", "endDate", "isAvailable", "bookableProductId",
+    "linkedProductId", "bookingId"
+)
+
+# A single `bookable-slots` request covering several targets. `tag_products`
+# maps each of the request's tag IDs to the bookable product IDs targeted in
+# that category, or to `None` if any product will do.
+ScheduleQuery = namedtuple(
+    "ScheduleQuery", ["start_str", "end_str", "tag_products"]
+)
+
+
+def bookable_slots_url(start_str, end_str, tag_ids, product_ids=None,
+                       fields=SLOT_FIELDS, now=None):
+    """
+    Builds the URL for a `bookable-slots` request that only covers slots
+    between the given `start_str` and `end_str` for the given `tag_ids` and,
+    if given, `product_ids`.
+
+    Only the given `fields` are requested. The current time used in the
+    availability filter is truncated to the minute, so repeated requests
+    within the same minute share a URL and can be answered conditionally.
+    """
+    now = now or datetime.today()
+    now_str = now.strftime("%Y-%m-%dT%H:%M:00")
+
+    slot_filter = {
+        "startDate": start_str,
+        "endDate": end_str,
+        "tagIds": {"$in": list(tag_ids)},
+        "availableFromDate": {"$gt": now_str},
+        "availableTillDate": {"$gte": now_str}
+    }
+    if product_ids:
+        slot_filter["bookableProductId"] = {"$in": list(product_ids)}
+
+    s = quote(json.dumps(slot_filter, separators=(",", ":")), safe=":,$")
+    url = f"{API_URL}/bookable-slots?s={s}"
+    if fields:
+        url += f"&fields={','.join(fields)}"
+
+    return url
+
+
+def query_url(query, now=None):
+    """
+    Builds the `bookable-slots` URL for the given schedule `query`.
+    """
+    product_sets = query.tag_products.values()
+    product_ids = None if None in product_sets \
+        else sorted(set().union(*product_sets))
+
+    return bookable_slots_url(
+        query.start_str, query.end_str, sorted(query.tag_products),
+        product_ids, now=now
+    )
+
+
+def plan_queries(targets, max_gap=21600):
+    """
+    Merges the given `targets` into as few schedule queries as possible.
+
+    Slots don't reveal their category, so categories in which any product
+    will do get a query of their own. All other categories share queries, as
+    their slots can be told apart by product. Targets whose start times are
+    more than `max_gap` seconds apart end up in separate queries, to keep the
+    responses small.
+    """
+    tag_products = {}
+    for target in targets:
+        products = tag_products.setdefault(target.tag_id, set())
+        if target.subcategory_id is None or products is None:
+            tag_products[target.tag_id] = None
+        else:
+            products.add(target.subcategory_id)
+
+    # Group the targets of categories whose slots can share a response
+    groups = {}
+    for target in targets:
+        key = target.tag_id if tag_products[target.tag_id] is None else None
+        groups.setdefault(key, []).append(target)
+
+    queries = []
+    for group in groups.values():
+        group.sort(key=lambda t: t.slot_str)
+
+        cluster = [group[0]]
+        for target in group[1:]:
+            gap = time_slot_str_to_epoch(target.slot_str) - \
+                time_slot_str_to_epoch(cluster[-1].slot_str)
+            if gap > max_gap:
+                queries.append(_cluster_query(cluster, tag_products))
+                cluster = []
+            cluster.append(target)
+        queries.append(_cluster_query(cluster, tag_products))
+
+    return queries
+
+
+def _cluster_query(targets, tag_products):
+    start_str = targets[0].slot_str
+    end_str = shift_time_slot_str(targets[-1].slot_str, 3600)
+
+    return ScheduleQuery(start_str, end_str, {
+        t.tag_id: tag_products[t.tag_id] for t in targets
+    })
+
+
+def demultiplex(query, slots):
+    """
+    Splits the `slots` obtained with the given schedule `query` by category.
+    Returns a dictionary that maps every tag ID of the query to its slots.
+    """
+    slots_by_tag = {tag_id: [] for tag_id in query.tag_products}
+    for slot in slots:
+        for (tag_id, products) in query.tag_products.items():
+            if products is None or slot["bookableProductId"] in products:
+                slots_by_tag[tag_id].append(slot)
+
+    return slots_by_tag
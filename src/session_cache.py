@@ -0,0 +1,249 @@
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+
+from auth import (
+    AuthMethod, auth, fetch_member_id, session_from_token, terminate_session,
+    tud_login, tud_refresh
+)
+from constants import CACHE_DIR
+
+
+SESSION_CACHE_PATH = os.path.join(CACHE_DIR, "sessions.json")
+
+# Lifetime assumed for tokens whose expiry can't be read from the token itself
+DEFAULT_TOKEN_LIFETIME = 3600
+
+# Tokens are refreshed after at least this fraction of their lifetime, and at
+# most this often, however short-lived they are
+MAX_REFRESH_MARGIN_FRACTION = 0.5
+MIN_REFRESH_INTERVAL = 10
+
+# Serialises updates of cache files by the threads of this process
+_cache_lock = threading.RLock()
+
+
+class AuthSession:
+    """
+    Keeps an authenticated session for a single user warm, so bookings don't
+    have to wait for authentication.
+
+    Access tokens and member IDs are cached on disk until they expire and are
+    refreshed in the background `refresh_margin` seconds before they do, or
+    halfway through their lifetime if they don't last much longer. For
+    TU Delft SSO, the refresh token is cached as well, so re-authentication
+    takes a single request instead of the full SAML login.
+    """
+
+    def __init__(self, username, passw, auth_method, refresh_margin=300,
+                 cache_path=SESSION_CACHE_PATH):
+        self.username = username
+        self.passw = passw
+        self.auth_method = auth_method
+        self.refresh_margin = refresh_margin
+        self.cache_path = cache_path
+
+        self.session = None
+        self.token = None
+        self.member_id = None
+        self.refresh_token = None
+        self.issued_at = 0
+        self.expires_at = 0
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._refresher = None
+
+    def get(self):
+        """
+        Returns a `(session, token, member_id)` tuple for this user, only
+        authenticating if no valid token is available in memory or on disk.
+        """
+        with self._lock:
+            if self.session is None or self._expired():
+                if not self._load_from_cache():
+                    self._authenticate()
+
+            return (self.session, self.token, self.member_id)
+
+    def start_refreshing(self):
+        """
+        Authenticates ahead of time and keeps the token fresh in a background
+        thread until `close` is called.
+        """
+        self.get()
+
+        if self._refresher is None:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, daemon=True
+            )
+            self._refresher.start()
+
+    def refresh(self):
+        """
+        Discards the current token and authenticates again.
+        """
+        with self._lock:
+            self._authenticate()
+
+    def close(self):
+        """
+        Stops the background refresher and terminates the current session.
+        """
+        self._stopped.set()
+        if self.session is not None:
+            terminate_session(self.session)
+
+    def _refresh_loop(self):
+        while True:
+            if self._stopped.wait(self._refresh_delay()):
+                return
+
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[!] Failed to refresh authentication: {e}")
+                self._stopped.wait(30)
+
+    def _refresh_delay(self):
+        lifetime = self.expires_at - self.issued_at
+        margin = min(self.refresh_margin,
+                     lifetime * MAX_REFRESH_MARGIN_FRACTION)
+
+        delay = self.expires_at - margin - time.time()
+        return max(delay, MIN_REFRESH_INTERVAL)
+
+    def _expired(self):
+        return time.time() >= self.expires_at
+
+    def _authenticate(self):
+        old_session = self.session
+        self.issued_at = int(time.time())
+        if self.auth_method == AuthMethod.TUD_SSO:
+            self._tud_authenticate()
+        else:
+            (self.session, self.token, self.member_id) = \
+                auth(self.username, self.passw, self.auth_method)
+            self.expires_at = token_expiry(self.token)
+
+        if old_session is not None:
+            terminate_session(old_session)
+
+        self._store_in_cache()
+
+    def _tud_authenticate(self):
+        tokens = None
+        if self.refresh_token is not None:
+            try:
+                (session, tokens) = tud_refresh(self.refresh_token)
+            except Exception as e:
+                print(f"[!] Failed to use refresh token, logging in again: {e}")
+
+        if tokens is None or self.member_id is None:
+            print(f"Authenticating with method '{self.auth_method.name}'...")
+            (session, tokens) = tud_login(self.username, self.passw)
+            self.member_id = fetch_member_id(session, "tud_auth.r7")
+
+        self.session = session
+        self.token = tokens["access_token"]
+        # Providers may or may not rotate refresh tokens
+        self.refresh_token = tokens.get("refresh_token", self.refresh_token)
+        if "expires_in" in tokens:
+            self.expires_at = int(time.time()) + int(tokens["expires_in"])
+        else:
+            self.expires_at = token_expiry(self.token)
+
+    def _cache_key(self):
+        return f"{self.auth_method.name}:{self.username}"
+
+    def _load_from_cache(self):
+        entry = load_cache(self.cache_path).get(self._cache_key())
+        if entry is None:
+            return False
+
+        # An expired access token can still be renewed with its refresh token
+        self.refresh_token = entry.get("refresh_token", self.refresh_token)
+        self.member_id = entry["member_id"]
+        if time.time() >= entry["expires_at"]:
+            return False
+
+        self.token = entry["token"]
+        self.issued_at = entry.get("issued_at", int(time.time()))
+        self.expires_at = entry["expires_at"]
+        self.session = session_from_token(self.token)
+
+        return True
+
+    def _store_in_cache(self):
+        update_cache(self.cache_path, {
+            self._cache_key(): {
+                "token": self.token,
+                "member_id": self.member_id,
+                "refresh_token": self.refresh_token,
+                "issued_at": self.issued_at,
+                "expires_at": self.expires_at
+            }
+        })
+
+
+def token_expiry(token):
+    """
+    Returns the UNIX timestamp at which the given access `token` expires,
+    based on its JWT `exp` claim if it has one.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return int(time.time()) + DEFAULT_TOKEN_LIFETIME
+
+
+def load_cache(path=SESSION_CACHE_PATH):
+    """
+    Returns the session cache stored at `path`, or an empty cache if it does
+    not exist or can't be read.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def store_cache(path, cache):
+    """
+    Writes the given session `cache` to `path`, readable only by the current
+    user.
+
+    The cache is written to a temporary file of its own first, which then
+    replaces the file at `path`, so readers never see a partial cache.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    with _cache_lock:
+        (fd, tmp_path) = tempfile.mkstemp(
+            dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def update_cache(path, entries):
+    """
+    Adds the given `entries` to the cache at `path`, without losing the
+    entries that other threads store at the same time.
+    """
+    with _cache_lock:
+        cache = load_cache(path)
+        cache.update(entries)
+        store_cache(path, cache)
@@ -0,0 +1,163 @@
+from collections import namedtuple
+from enum import Enum
+import time
+
+from time_slot_manip import time_slot_str_to_epoch
+
+
+class SlotEventType(Enum):
+    ADDED = 0
+    REMOVED = 1
+    FREED = 2
+    FILLED = 3
+    WINDOW_OPENED = 4
+
+
+# A change to a single slot between successive schedule polls
+SlotEvent = namedtuple("SlotEvent", ["type", "slot"])
+
+
+class Slot:
+    """
+    A compact representation of a bookable slot in X's schedule, holding only
+    the fields required to match, check and book it.
+    """
+    __slots__ = (
+        "start_str", "end_str", "start", "end", "product_id",
+        "linked_product_id", "booking_id", "tag_id", "is_available", "seen"
+    )
+
+    def __init__(self, raw, tag_id=None):
+        self.start_str = raw["startDate"]
+        self.end_str = raw["endDate"]
+        self.start = time_slot_str_to_epoch(self.start_str)
+        self.end = time_slot_str_to_epoch(self.end_str)
+        self.product_id = raw["bookableProductId"]
+        self.linked_product_id = raw["linkedProductId"]
+        self.booking_id = raw.get("bookingId")
+        self.tag_id = tag_id
+        self.is_available = raw["isAvailable"]
+        self.seen = 0
+
+    def as_dict(self):
+        """
+        Returns this slot in the format of X's schedule, as required by
+        `booking.book_slot`.
+        """
+        return {
+            "startDate": self.start_str,
+            "endDate": self.end_str,
+            "bookableProductId": self.product_id,
+            "linkedProductId": self.linked_product_id,
+            "bookingId": self.booking_id,
+            "isAvailable": self.is_available
+        }
+
+
+class SlotStore:
+    """
+    Holds the slots of successive schedule polls, indexed by start time and
+    bookable product ID and by tag ID.
+
+    Slots are parsed once, when they first appear. Later polls only update the
+    availability of known slots in place.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.by_start = {}
+        self.by_tag = {}
+        self.generations = {}
+
+    def update(self, raw_slots, tag_id=None):
+        """
+        Updates the store with the given `raw_slots` from a schedule poll for
+        the given `tag_id`. Slots of that tag that are missing from
+        `raw_slots` are considered unavailable.
+
+        `raw_slots` may be any iterable of slots, such as a stream. Returns
+        whether the update changed the availability of any slot.
+        """
+        return bool(self.apply(raw_slots, tag_id))
+
+    def apply(self, raw_slots, tag_id=None):
+        """
+        Updates the store like `update`, but returns the list of
+        `SlotEvent`s that describe how the slots of the given `tag_id`
+        changed since the previous poll.
+
+        Slots that weren't part of the previous poll are `ADDED`, slots that
+        no longer are are `REMOVED` and slots that stay part of it are
+        `FREED` or `FILLED` when their availability changes.
+        """
+        prev_generation = self.generations.get(tag_id, 0)
+        generation = prev_generation + 1
+        self.generations[tag_id] = generation
+
+        events = []
+        for raw in raw_slots:
+            key = (raw["startDate"], raw["bookableProductId"])
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self._add(key, raw, tag_id)
+                events.append(SlotEvent(SlotEventType.ADDED, slot))
+            elif slot.seen != prev_generation:
+                slot.is_available = raw["isAvailable"]
+                events.append(SlotEvent(SlotEventType.ADDED, slot))
+            elif slot.is_available != raw["isAvailable"]:
+                slot.is_available = raw["isAvailable"]
+                event_type = SlotEventType.FREED if slot.is_available \
+                    else SlotEventType.FILLED
+                events.append(SlotEvent(event_type, slot))
+
+            slot.booking_id = raw.get("bookingId")
+            slot.seen = generation
+
+        # Slots that were present in the previous poll may have disappeared
+        if prev_generation > 0:
+            events.extend(
+                SlotEvent(SlotEventType.REMOVED, slot)
+                for slot in self.tag_slots(tag_id)
+                if slot.seen == prev_generation
+            )
+
+        return events
+
+    def find(self, start_str, product_id=None):
+        """
+        Returns the slot starting at the X timestamp `start_str` for the given
+        `product_id`, or for any product if `product_id` is `None`. Returns
+        `None` if there is no such slot.
+        """
+        if product_id is not None:
+            return self.slots.get((start_str, product_id))
+
+        slots = self.by_start.get(start_str)
+        return slots[0] if slots else None
+
+    def tag_slots(self, tag_id):
+        """
+        Returns all known slots for the given `tag_id`.
+        """
+        return self.by_tag.get(tag_id, [])
+
+    def is_bookable(self, slot, booking_window, now=None):
+        """
+        Returns whether the given `slot` was available in the latest poll of
+        its tag and starts within `booking_window` seconds from the UNIX
+        timestamp `now`, i.e., its booking window opened at or before `now`.
+        """
+        now = time.time() if now is None else now
+
+        return slot.is_available and \
+            slot.seen == self.generations.get(slot.tag_id) and \
+            slot.start - now <= booking_window
+
+    def _add(self, key, raw, tag_id):
+        slot = Slot(raw, tag_id)
+
+        self.slots[key] = slot
+        self.by_start.setdefault(slot.start_str, []).append(slot)
+        self.by_tag.setdefault(tag_id, []).append(slot)
+
+        return slot
@@ -0,0 +1,51 @@
+import time
+
+from booking import attempt_booking, cancel_slot
+from time_slot_manip import shift_time_slot_str
+
+
+def swap_slot(participation_id, slot_str, member_id, username, passw,
+              auth_method, tag_id, subcategory_id=None, cancel_attempts=3,
+              daemon_socket=None):
+    """
+    Moves the existing participation with the given `participation_id` to
+    the slot starting at the given `slot_str`.
+
+    The new slot is watched and booked like any other, with the session
+    authenticated ahead of time. The old participation is only cancelled once
+    the new slot has been booked, with the same session and right after, so
+    the user never ends up without a booking. Nothing is cancelled if the new
+    slot turns out to be booked for the user already. If cancelling keeps
+    failing after `cancel_attempts` attempts, the user is left with both
+    bookings.
+    """
+    cancel_url = f"participations/{participation_id}"
+
+    def cancel_old_participation(session):
+        booked_at = time.monotonic()
+        cancelled = False
+        for _ in range(cancel_attempts):
+            try:
+                cancelled = cancel_slot(participation_id, session)
+            except Exception as e:
+                print(e)
+            if cancelled:
+                break
+
+        gap = (time.monotonic() - booked_at) * 1000
+        if not cancelled:
+            print(f"[!] Booked the new slot, but failed to cancel "
+                  f"{cancel_url} for {gap:.1f} ms. Cancel it yourself.")
+            return
+
+        print(f"Cancelled {cancel_url} {gap:.1f} ms after booking the new "
+              f"slot.")
+
+    print(f"Swapping {cancel_url} for the slot at {slot_str}.")
+
+    slot_end = shift_time_slot_str(slot_str, 3600)
+    attempt_booking(
+        slot_str, slot_str, slot_end, member_id, username, passw, auth_method,
+        tag_id, subcategory_id, daemon_socket=daemon_socket,
+        after_booking=cancel_old_participation
+    )
@@ -1,6 +1,7 @@
 from enum import Enum
 
-from fuzzywuzzy import process
+from aliases import build_alias_table, resolve_alias
+from booking_tag_id import BookingTagId
 
 
 class SubcategoryId(Enum):
@@ -21,13 +22,19 @@ class SubcategoryId(Enum):
     def from_string(s):
         """
         Constructs and returns a subcateogry ID from the given category string
-        `s` by fuzzy searching for the best match.
+        `s` by looking it up in a table of aliases, or by fuzzy searching for
+        the best match if there is no matching alias.
 
         >>> SubcategoryId.from_string("3a")
         <SubcategoryId.X3A: 16534>
         >>> SubcategoryId.from_string("court 1")
         <SubcategoryId.BEACH_COURT_1: 36>
         """
+        match = resolve_alias(s, SUBCATEGORY_ID_ALIAS_TABLE)
+        if match is not None:
+            return match
+
+        from fuzzywuzzy import process
         match, _ = process.extractOne(s, SUBCATEGORY_ID_STRING_MAP.keys())
         return SUBCATEGORY_ID_STRING_MAP[match]
 
@@ -37,3 +44,16 @@ SUBCATEGORY_ID_STRING_MAP = {
     for subcategory_id
     in list(SubcategoryId)
 }
+
+SUBCATEGORY_ID_ALIAS_TABLE = build_alias_table(list(SubcategoryId))
+
+SUBCATEGORY_ID_BOOKING_TAG_ID_MAP = {
+    SubcategoryId.X1A: BookingTagId.HALL_X1,
+    SubcategoryId.X1B: BookingTagId.HALL_X1,
+    SubcategoryId.X3A: BookingTagId.HALL_X3,
+    SubcategoryId.X3B: BookingTagId.HALL_X3,
+    SubcategoryId.BEACH_COURT_1: BookingTagId.BEACH_VOLLEYBALL_COURT,
+    SubcategoryId.BEACH_COURT_2: BookingTagId.BEACH_VOLLEYBALL_COURT,
+    SubcategoryId.BEACH_COURT_3: BookingTagId.BEACH_VOLLEYBALL_COURT,
+    SubcategoryId.BEACH_COURT_4: BookingTagId.BEACH_VOLLEYBALL_COURT
+}
@@ -0,0 +1,121 @@
+from collections import namedtuple
+import json
+
+from booking_tag_id import BookingTagId
+from constants import BEACH_VOLLEYBALL_COURT_PRODUCT_IDS
+from subcategory_id import SubcategoryId, SUBCATEGORY_ID_BOOKING_TAG_ID_MAP
+from time_slot_manip import date_and_hour_to_time_slot_str
+
+
+# A single slot to watch and book. `date` is the slot's date as given by the
+# user, whereas `slot_str` is the slot's start time as an X timestamp in UTC.
+Target = namedtuple("Target", ["date", "slot_str", "tag_id", "subcategory_id"])
+
+# An alternative slot to book within a target's category. A `subcategory_id`
+# of `None` matches any court or hall of the category.
+Candidate = namedtuple("Candidate", ["slot_str", "subcategory_id"])
+
+
+def make_target(date, hour, category="gym", court=None, in_utc=False):
+    """
+    Constructs a target for the slot at the given `date` and `hour` in the
+    booking category that best matches the given `category` string.
+    """
+    (tag_id, subcategory_id) = resolve_category(category, court)
+    slot_str = date_and_hour_to_time_slot_str(date, hour, in_utc=in_utc)
+
+    return Target(date, slot_str, tag_id, subcategory_id)
+
+
+def resolve_category(category, court=None):
+    """
+    Returns a `(tag_id, subcategory_id)` tuple for the given `category` string
+    and optional `court`, which is resolved like `resolve_court` does. Raises
+    a `ValueError` if the category has no such court.
+    """
+    tag_id = BookingTagId.from_string(category).value
+
+    subcategory_id = None
+    if court:
+        subcategory_id = resolve_court(str(court), category)
+    elif tag_id != BookingTagId.GYM.value:
+        subcategory_id = SubcategoryId.from_string(category).value
+
+    return (tag_id, subcategory_id)
+
+
+def parse_target(target_str, in_utc=False):
+    """
+    Parses a target formatted as "DATE HOUR [CATEGORY] [COURT]", e.g.,
+    "2024-07-30 19 beach 2".
+    """
+    parts = target_str.split()
+    if len(parts) < 2 or len(parts) > 4:
+        raise ValueError(f"invalid target '{target_str}'")
+
+    category = parts[2] if len(parts) > 2 else "gym"
+    court = parts[3] if len(parts) > 3 else None
+
+    return make_target(parts[0], int(parts[1]), category, court, in_utc)
+
+
+def parse_fallback(fallback_str, date, category="gym", in_utc=False):
+    """
+    Parses a fallback slot in the given `category` formatted as
+    "[DATE] HOUR [COURT]", e.g., "20" or "2024-07-31 19 2". Fallbacks without
+    a date are on the given `date`, and fallbacks without a court match any
+    court or hall of the category. Courts are given by number for beach
+    volleyball and by name, e.g., "x1a", for halls.
+    """
+    parts = fallback_str.split()
+    if parts and "-" in parts[0]:
+        (date, parts) = (parts[0], parts[1:])
+    if len(parts) < 1 or len(parts) > 2:
+        raise ValueError(f"invalid fallback '{fallback_str}'")
+
+    subcategory_id = None
+    if len(parts) > 1:
+        subcategory_id = resolve_court(parts[1], category)
+
+    slot_str = date_and_hour_to_time_slot_str(
+        date, int(parts[0]), in_utc=in_utc
+    )
+    return Candidate(slot_str, subcategory_id)
+
+
+def resolve_court(court, category):
+    """
+    Returns the subcategory ID of the given `court` string in the category
+    that best matches the given `category` string. Raises a `ValueError` if
+    the category has no such court.
+    """
+    tag = BookingTagId.from_string(category)
+    if court.isdigit():
+        if tag == BookingTagId.BEACH_VOLLEYBALL_COURT and \
+                int(court) in BEACH_VOLLEYBALL_COURT_PRODUCT_IDS:
+            return BEACH_VOLLEYBALL_COURT_PRODUCT_IDS[int(court)]
+    else:
+        subcategory = SubcategoryId.from_string(court)
+        if SUBCATEGORY_ID_BOOKING_TAG_ID_MAP.get(subcategory) == tag:
+            return subcategory.value
+
+    raise ValueError(f"{tag} has no court '{court}'")
+
+
+def load_targets(path, in_utc=False):
+    """
+    Loads the targets from the JSON file at `path`, which should contain a list
+    of objects with a "date" and "hour" and optionally a "category" and
+    "court", e.g., `[{"date": "2024-07-30", "hour": 19, "category": "beach",
+    "court": 2}]`.
+    """
+    with open(path, "r") as f:
+        entries = json.load(f)
+
+    return [
+        make_target(
+            e["date"], int(e["hour"]), e.get("category", "gym"),
+            e.get("court"), e.get("utc", in_utc)
+        )
+        for e in entries
+    ]
@@ -1,4 +1,31 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from functools import lru_cache
+import time
+
+
+# X is located in Delft, so dates and hours given by users are local to it
+X_TIMEZONE_NAME = "Europe/Amsterdam"
+
+_x_timezone = None
+
+
+def x_timezone():
+    """
+    Returns X's timezone. Raises an exception if no timezone data is
+    available, as any other timezone would shift hours around DST changes.
+    """
+    global _x_timezone
+    if _x_timezone is None:
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+        try:
+            _x_timezone = ZoneInfo(X_TIMEZONE_NAME)
+        except ZoneInfoNotFoundError:
+            raise RuntimeError(
+                f"No timezone data for {X_TIMEZONE_NAME}. Install the "
+                f"requirements, which include the tzdata package."
+            )
+
+    return _x_timezone
 
 
 def date_and_hour_to_time_slot_str(date_str, start_hour, in_utc=False,
@@ -10,47 +37,79 @@ def date_and_hour_to_time_slot_str(date_str, start_hour, in_utc=False,
     Arguments"
         `date_str`: A date string formatted as YYYY-MM-DD.
         `start_hour`: The slot's start hour provided as an integer 6 < i < 24.
-        `in_utc`: Whether the given arguments are already in UTC.
+        `in_utc`: Whether the given arguments are already in UTC, rather than
+                  in X's timezone.
         `with_millis`: Whether the returned string should end with ".000Z".
     """
-    if not in_utc:
-        start_hour = apply_utc_diff(start_hour)
-
-    base_str = f"{date_str}T{str(start_hour).zfill(2)}:00:00"
+    (year, month, day) = (int(part) for part in date_str.split("-"))
+    tz = timezone.utc if in_utc else x_timezone()
+    local = datetime(year, month, day, start_hour, tzinfo=tz)
 
+    time_slot_str = epoch_to_time_slot_str(int(local.timestamp()))
     if with_millis:
-        return f"{base_str}.000Z"
+        return time_slot_str
+
+    return time_slot_str[:19]
 
-    return base_str
 
+@lru_cache(maxsize=4096)
+def time_slot_str_to_epoch(time_slot_str):
+    """
+    Returns the UNIX timestamp in whole seconds corresponding to the given X
+    timestamp.
 
-def apply_utc_diff(hour):
+    X's timestamps are always formatted as "YYYY-MM-DDTHH:MM:SS.mmmZ", so
+    those are parsed by slicing, and only once per distinct timestamp.
     """
-    Converts the given `hour` to UTC based on the difference between the user's
-    timezone and UTC.
+    s = time_slot_str
+    if len(s) == 24 and s[4] == "-" and s[10] == "T" and s[23] == "Z":
+        days = _days_from_civil(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+        return days * 86400 + int(s[11:13]) * 3600 + int(s[14:16]) * 60 + \
+            int(s[17:19])
+
+    t = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return int(t.timestamp())
 
-    Note that this naive implementation does not account for hour differences
-    that leak into the previous or next day.
+
+@lru_cache(maxsize=4096)
+def epoch_to_time_slot_str(epoch):
+    """
+    Returns the X timestamp corresponding to the given UNIX timestamp in
+    whole seconds.
     """
-    return hour + int(
-        (datetime.utcnow() - datetime.now()).total_seconds()
-    ) // 3600
+    t = time.gmtime(epoch)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}T" \
+        f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}.000Z"
 
 
-def utc_seconds_difference():
+def seconds_until(time_slot_str, now=None):
     """
-    Returns the absolute difference in seconds between the current timezone and
-    UTC.
+    Returns the number of seconds from the UNIX timestamp `now` until the
+    given X timestamp, which is negative if it lies in the past.
     """
-    return int(abs(datetime.now() - datetime.utcnow()).total_seconds())
+    now = time.time() if now is None else now
+    return time_slot_str_to_epoch(time_slot_str) - int(now)
 
 
-def seconds_diff(start_str, end_str):
+def shift_time_slot_str(time_slot_str, seconds):
     """
-    Computes and returns the difference in hours between the two given time
-    strings.
+    Returns the X timestamp that lies the given number of `seconds` after the
+    given `time_slot_str`.
     """
-    start = start_str if isinstance(start_str, datetime) \
-        else datetime.strptime(start_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-    end = datetime.strptime(end_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-    return int((end - start).total_seconds())
+    return epoch_to_time_slot_str(
+        time_slot_str_to_epoch(time_slot_str) + int(seconds)
+    )
+
+
+def _days_from_civil(year, month, day):
+    # Howard Hinnant's days-from-civil algorithm for the proleptic Gregorian
+    # calendar, which only needs integer arithmetic
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + \
+        day_of_year
+    return era * 146097 + day_of_era - 719468
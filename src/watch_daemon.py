@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+
+from booking import booking_schedule, get_booking_window
+from booking_tag_id import BookingTagId
+from daemon_client import DAEMON_SOCKET_PATH
+import history
+from schedule_events import ScheduleEvents
+from time_slot_manip import shift_time_slot_str
+
+
+class ScheduleDaemon:
+    """
+    Polls the schedules that clients subscribe to and fans every result out to
+    all of the schedule's subscribers, so the number of upstream requests
+    depends on the number of distinct schedules rather than on the number of
+    watchers.
+
+    A schedule is identified by a booking tag ID and a date (in UTC) and is
+    only polled while it has at least one subscriber. If history recording is
+    enabled, the availability changes of every polled schedule are recorded.
+    """
+
+    def __init__(self, interval=1):
+        self.interval = interval
+        self.subscribers = {}
+        self.pollers = {}
+        self.last_messages = {}
+
+    def serve(self, socket_path=DAEMON_SOCKET_PATH, mode=0o660):
+        """
+        Serves subscriptions on the Unix socket at `socket_path` until
+        interrupted.
+        """
+        asyncio.run(self._serve(socket_path, mode))
+
+    async def _serve(self, socket_path, mode):
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        server = await asyncio.start_unix_server(
+            self._handle_client, path=socket_path
+        )
+        os.chmod(socket_path, mode)
+        print(f"Serving schedules on {socket_path}.")
+
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_client(self, reader, writer):
+        keys = set()
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                key = (int(request["tag_id"]), request["date"])
+                keys.add(key)
+                self._subscribe(key, writer)
+        except (ValueError, KeyError, ConnectionError) as e:
+            print(f"[!] Dropping client: {e}")
+        finally:
+            for key in keys:
+                self._unsubscribe(key, writer)
+            writer.close()
+
+    def _subscribe(self, key, writer):
+        self.subscribers.setdefault(key, set()).add(writer)
+
+        # Bring new subscribers up to date without waiting for the next poll
+        if key in self.last_messages:
+            writer.write(self.last_messages[key])
+
+        if key not in self.pollers:
+            self.pollers[key] = asyncio.create_task(self._poll(key))
+
+    def _unsubscribe(self, key, writer):
+        subscribers = self.subscribers.get(key, set())
+        subscribers.discard(writer)
+        if not subscribers:
+            self.subscribers.pop(key, None)
+
+    async def _poll(self, key):
+        (tag_id, date) = key
+        start_str = f"{date}T00:00:00.000Z"
+        end_str = shift_time_slot_str(start_str, 86400)
+
+        events = None
+        if history.recording():
+            events = ScheduleEvents(
+                tag_id, get_booking_window(BookingTagId(tag_id))
+            )
+
+        loop = asyncio.get_running_loop()
+        next_poll = loop.time()
+        while self.subscribers.get(key):
+            slots = await asyncio.to_thread(
+                booking_schedule, start_str, end_str, tag_id
+            )
+            if slots is not None:
+                self._publish(key, slots)
+                if events is not None:
+                    events.feed(slots)
+
+            next_poll += self.interval
+            await asyncio.sleep(max(next_poll - loop.time(), 0))
+
+        self.pollers.pop(key, None)
+        self.last_messages.pop(key, None)
+
+    def _publish(self, key, slots):
+        (tag_id, date) = key
+        message = json.dumps({"tag_id": tag_id, "date": date, "slots": slots})
+        message = f"{message}\n".encode()
+        self.last_messages[key] = message
+
+        for writer in list(self.subscribers.get(key, ())):
+            # Drop clients that have stopped reading rather than buffering
+            # their updates indefinitely
+            if writer.is_closing() or \
+                    writer.transport.get_write_buffer_size() > 2 ** 20:
+                self._unsubscribe(key, writer)
+                writer.close()
+                continue
+
+            writer.write(message)
@@ -0,0 +1,272 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from account import Account
+from booking import (
+    batched_booking_schedule, book_authenticated, get_booking_window
+)
+from booking_result import BookingResult
+from booking_tag_id import BookingTagId
+from history import cancellation_profile
+from http_client import warm_up
+from poll_scheduler import PollScheduler
+from retry_policy import SCHEDULE_POLICY
+from schedule_query import plan_queries
+from session_cache import AuthSession
+from schedule_events import ScheduleEvents
+from time_slot_manip import seconds_until, time_slot_str_to_epoch
+
+
+def watch_targets(targets, username, passw, auth_method, member_id=None,
+                  interval=1):
+    """
+    Watches all given `targets` in a single process and books each of them as
+    soon as it becomes available. Blocks until every target has been booked or
+    has started.
+    """
+    account = Account(username, member_id, auth_method)
+    watch_targets_for_accounts(
+        [(target, account) for target in targets], {username: passw},
+        interval
+    )
+
+
+def watch_targets_for_accounts(assignments, passwords, interval=1):
+    """
+    Watches the targets in the given `(target, account)` `assignments` and
+    books each target for its account as soon as it becomes available.
+    `passwords` maps the accounts' usernames to their passwords.
+
+    Every account gets its own session, which is authenticated ahead of time.
+    Targets that become available at the same time are booked in parallel.
+    """
+    asyncio.run(_watch_targets(assignments, passwords, interval))
+
+
+async def _watch_targets(assignments, passwords, interval):
+    accounts = {account for (_, account) in assignments}
+
+    # Targets in the same category on the same day share a poll schedule
+    groups = {}
+    for (target, account) in assignments:
+        key = (target.tag_id, target.date)
+        groups.setdefault(key, []).append((target, account))
+
+    # Make sure every account can send its booking request at the same time
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=len(accounts) + len(groups) + 4)
+    )
+
+    await asyncio.to_thread(warm_up)
+
+    auth_sessions = {
+        account: AuthSession(
+            account.username, passwords[account.username], account.auth_method
+        )
+        for account in accounts
+    }
+    await asyncio.gather(*[
+        asyncio.to_thread(auth_session.start_refreshing)
+        for auth_session in auth_sessions.values()
+    ])
+
+    targets = [target for (target, _) in assignments]
+    print(f"Watching {len(assignments)} target(s) for {len(accounts)} "
+          f"account(s) with {len(plan_queries(targets))} request(s) per poll.")
+
+    await _watch_groups(groups, auth_sessions, interval)
+
+    for auth_session in auth_sessions.values():
+        auth_session.close()
+
+
+class _GroupWatch:
+    """
+    Tracks the targets of a single category on a single day, which share a
+    slot store and a poll schedule.
+    """
+
+    def __init__(self, tag_id, assignments, interval):
+        self.tag_id = tag_id
+        self.pending = sorted(assignments, key=lambda a: a[0].slot_str)
+        self.interval = interval
+        self.booking_window = get_booking_window(BookingTagId(tag_id))
+        self.events = ScheduleEvents(tag_id, self.booking_window)
+        self.store = self.events.store
+        self.retry = set()
+        self.earliest = None
+        self.scheduler = None
+
+    def schedule(self):
+        """
+        Makes sure polls are scheduled around the earliest target that is
+        still pending.
+        """
+        if self.pending[0][0] is not self.earliest:
+            self.earliest = self.pending[0][0]
+            self.scheduler = PollScheduler(
+                seconds_until(self.earliest.slot_str),
+                self.booking_window, base_interval=self.interval,
+                profile=cancellation_profile(
+                    self.tag_id, int(self.earliest.slot_str[11:13])
+                )
+            )
+
+    async def process(self, slots, auth_sessions):
+        """
+        Updates the store with the `slots` of a poll and books the targets
+        whose slots changed such that they became available.
+        """
+        changes = self.events.feed(slots)
+        self.scheduler.record_poll(changed=bool(changes))
+
+        # The earliest slot's product knows when its booking window opens
+        slot = self.store.find(
+            self.earliest.slot_str, self.earliest.subcategory_id
+        )
+        if slot is not None and changes:
+            product_window = await asyncio.to_thread(
+                get_booking_window, BookingTagId(self.tag_id),
+                slot.linked_product_id
+            )
+            if product_window != self.booking_window:
+                self.booking_window = product_window
+                self.scheduler.set_booking_window(product_window)
+                self.events.set_booking_window(product_window)
+
+        # Targets whose slots didn't change can't have become bookable,
+        # unless booking them failed before or they are available and waiting
+        # for their booking window to open
+        changed_slots = {id(event.slot) for event in changes}
+        candidates = self.retry | {
+            (target, account) for (target, account) in self.pending
+            if self._may_be_bookable(target, changed_slots)
+        }
+
+        (self.pending, self.retry) = await _book_available(
+            self.pending, self.store, self.booking_window, auth_sessions,
+            candidates
+        )
+
+
+    def own_slots(self, slots):
+        """
+        Returns the `slots` that lie within the time ranges this watch would
+        query on its own, dropping the slots of other days obtained for other
+        watches of the same category.
+        """
+        ranges = [
+            (query.start_str, query.end_str)
+            for query in plan_queries([target for (target, _) in self.pending])
+        ]
+
+        return [
+            slot for slot in slots
+            if any(start <= slot["startDate"] < end for (start, end) in ranges)
+        ]
+
+    def _may_be_bookable(self, target, changed_slots):
+        slot = self.store.find(target.slot_str, target.subcategory_id)
+        return slot is not None and (
+            id(slot) in changed_slots or
+            self.store.is_bookable(slot, float("inf"))
+        )
+
+
+async def _watch_groups(groups, auth_sessions, interval, slack=0.5):
+    """
+    Polls the schedules of the given `groups` of `(target, account)`
+    assignments until all targets are booked or have started.
+
+    Every group keeps its own poll schedule, but groups that are due, or due
+    within `slack` seconds, are polled together with a single batch of
+    requests, whose results are split locally.
+    """
+    watches = [
+        _GroupWatch(tag_id, group, interval)
+        for ((tag_id, _), group) in groups.items()
+    ]
+    while watches:
+        for watch in watches:
+            watch.schedule()
+
+        delay = min(watch.scheduler.delay() for watch in watches)
+        await asyncio.sleep(max(delay, 0))
+
+        due = [watch for watch in watches if watch.scheduler.delay() <= slack]
+        targets = [target for watch in due for (target, _) in watch.pending]
+        slots_by_tag = await asyncio.to_thread(
+            batched_booking_schedule, targets
+        )
+
+        if slots_by_tag is None:
+            blocked = SCHEDULE_POLICY.blocked_for()
+            for watch in due:
+                watch.scheduler.record_poll(changed=False)
+                watch.scheduler.postpone(blocked)
+            continue
+
+        # Watches of the same category on different days share its slots
+        await asyncio.gather(*[
+            watch.process(
+                watch.own_slots(slots_by_tag[watch.tag_id]), auth_sessions
+            )
+            for watch in due
+        ])
+        watches = [watch for watch in watches if watch.pending]
+
+
+async def _book_available(assignments, store, booking_window, auth_sessions,
+                          candidates=None):
+    """
+    Attempts to book every target in the given `(target, account)`
+    `assignments` that is bookable according to the slot `store`, only
+    considering the given `candidates` if there are any.
+
+    Returns the assignments that remain pending and the set of assignments
+    that could not be booked even though they were bookable.
+    """
+    now = time.time()
+
+    (pending, bookable) = ([], [])
+    for (target, account) in assignments:
+        slot = store.find(target.slot_str, target.subcategory_id)
+        start = slot.start if slot is not None \
+            else time_slot_str_to_epoch(target.slot_str)
+        if start <= now:
+            print(f"Slot at {target.slot_str} has started. Giving up.")
+        elif candidates is not None and (target, account) not in candidates \
+                or slot is None \
+                or not store.is_bookable(slot, booking_window, now):
+            pending.append((target, account))
+        else:
+            bookable.append((target, account, slot))
+
+    # Fire the booking requests of all accounts at once
+    results = await asyncio.gather(*[
+        asyncio.to_thread(_book, slot, account, auth_sessions[account])
+        for (_, account, slot) in bookable
+    ])
+
+    failed = set()
+    for ((target, account, _), booked) in zip(bookable, results):
+        if not booked:
+            print(f"Failed to book slot at {target.slot_str} for "
+                  f"{account.username}. Resuming attempts.")
+            pending.append((target, account))
+            failed.add((target, account))
+            continue
+
+        print(f"Succesfully booked slot at {target.slot_str} (UTC) for "
+              f"{account.username}!")
+
+    return (pending, failed)
+
+
+def _book(slot, account, auth_session):
+    (result, _) = book_authenticated(
+        slot.as_dict(), account.member_id, auth_session
+    )
+
+    return result in (BookingResult.BOOKED, BookingResult.ALREADY_BOOKED)
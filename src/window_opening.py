@@ -0,0 +1,102 @@
+import time
+
+from booking import (
+    attempt_booking, book_authenticated, discover_booking_window, find_slot,
+    stream_booking_schedule
+)
+from booking_result import BookingResult
+from clock_sync import measure_clock_offset, sleep_until
+from http_client import warm_up
+from session_cache import AuthSession
+from time_slot_manip import shift_time_slot_str, time_slot_str_to_epoch
+
+
+def book_at_window_open(slot_str, member_id, username, passw, auth_method,
+                        tag_id, subcategory_id=None, lead=0.005,
+                        burst_size=10, burst_interval=0.05):
+    """
+    Books the time slot with the given `slot_str` the moment its booking
+    window opens.
+
+    The local clock is calibrated against the server's clock, after which
+    xbook authenticates and sleeps until `lead` seconds before the window
+    opens. It then fires at most `burst_size` booking requests, spaced
+    `burst_interval` seconds apart, until one of them succeeds.
+
+    Falls back to regular booking attempts if the window is already open or
+    the burst doesn't result in a booking.
+    """
+    slot_end = shift_time_slot_str(slot_str, 3600)
+    product_ids = [subcategory_id] if subcategory_id is not None else None
+
+    window_open = time_slot_str_to_epoch(slot_str) - \
+        discover_booking_window(slot_str, tag_id, subcategory_id)
+
+    if window_open - time.time() < 60:
+        print("Booking window opens within a minute. Attempting regularly.")
+        return attempt_booking(
+            slot_str, slot_str, slot_end, member_id, username, passw,
+            auth_method, tag_id, subcategory_id
+        )
+
+    # Calibrate and authenticate shortly before the window opens, so neither
+    # the clock offset nor the token has time to go stale
+    sleep_until(window_open - 300)
+
+    warm_up()
+    (offset, uncertainty) = measure_clock_offset()
+    print(f"Server clock offset: {offset * 1000:.1f} ms "
+          f"(± {uncertainty * 1000:.1f} ms).")
+
+    auth_session = AuthSession(username, passw, auth_method)
+    auth_session.start_refreshing()
+
+    # The slot's static fields are all that's needed to build the request
+    sleep_until(window_open - offset - 10)
+    try:
+        slots = stream_booking_schedule(slot_str, slot_end, tag_id, product_ids)
+        try:
+            slot = find_slot(slot_str, slots, ignore_availability=True,
+                             subcategory_id=subcategory_id)
+
+            # Read the rest of the response, so its warm connection returns to
+            # the pool for the booking requests instead of being closed
+            for _ in slots:
+                pass
+        finally:
+            slots.close()
+    except Exception as e:
+        print(e)
+        slot = None
+
+    if slot is None:
+        print(f"Could not find a slot starting at {slot_str}. Exiting.")
+        auth_session.close()
+        exit(0)
+
+    booked = False
+    fire_time = window_open - offset - lead
+    sleep_until(fire_time)
+    fired_at = time.time()
+
+    for i in range(burst_size):
+        (result, _) = book_authenticated(slot, member_id, auth_session)
+        if result in (BookingResult.BOOKED, BookingResult.ALREADY_BOOKED):
+            booked = True
+            break
+
+        sleep_until(fire_time + (i + 1) * burst_interval)
+
+    print(f"Fired {(fired_at + offset - window_open) * 1000:+.1f} ms from "
+          f"the window opening (± {uncertainty * 1000:.1f} ms).")
+
+    auth_session.close()
+
+    if not booked:
+        print(f"Failed to book slot at {slot_str}. Attempting regularly.")
+        return attempt_booking(
+            slot_str, slot_str, slot_end, member_id, username, passw,
+            auth_method, tag_id, subcategory_id
+        )
+
+    print(f"Succesfully booked slot at {slot_str} (UTC)!")
@@ -3,25 +3,30 @@ import argparse
 import getpass
 import json
 import os
-import urllib3
 
-from auth import AuthMethod
-from booking import login_and_book_slot
-from booking_tag_id import BookingTagId
-from constants import BEACH_VOLLEYBALL_COURT_PRODUCT_IDS
-from subcategory_id import SubcategoryId
+from account import Account
+from auth_method import AuthMethod
+from daemon_client import DAEMON_SOCKET_PATH
+from targets import (
+    load_targets, make_target, parse_fallback, parse_target, resolve_category
+)
+from time_slot_manip import date_and_hour_to_time_slot_str
 
-# The certificate for x.tudelft.nl is untrusted, which produces many warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Modules that pull in requests and other heavy dependencies are only imported
+# once it is clear which of them the given arguments require, which keeps
+# xbook's startup fast.
+
+
+CONFIG_PATH = f"{os.path.dirname(__file__)}/../config.json"
 
 
 def parse_args():
     parser = argparse.ArgumentParser(
         prog="xbook", description="Book an activity time slot at X.")
 
-    parser.add_argument("date", metavar="date", type=str,
+    parser.add_argument("date", metavar="date", type=str, nargs="?",
         help="The date on which you want to book a time slot. Example: 2024-01-13")
-    parser.add_argument("hour", metavar="hour", type=int,
+    parser.add_argument("hour", metavar="hour", type=int, nargs="?",
         help="The hour at which your desired slot commences. Example: 09")
 
     parser.add_argument("--password", metavar="password", type=str, nargs=1,
@@ -34,33 +39,158 @@ def parse_args():
     parser.add_argument("--court", "-c", type=int, choices=[1, 2, 3, 4],
         help="The beach volleyball court to book.", default=None)
 
-    return parser.parse_args()
+    parser.add_argument("--fallback", "-f", metavar="slot", type=str,
+        action="append", default=[],
+        help="A slot in the same category to book instead if the given slot isn't available, formatted as \"[DATE] HOUR [COURT]\". Without a court, any court or hall is fine. Can be repeated, in order of preference.")
+
+    parser.add_argument("--at-window-open", action="store_true",
+        help="Book the slot the moment its booking window opens, using the server's clock.")
+
+    parser.add_argument("--book-first", metavar="rate", type=float, nargs="?",
+        const=2, default=None,
+        help="Send booking requests for a slot whose booking window is open without checking its availability first, at most <rate> times per second (2 by default).")
+
+    parser.add_argument("--swap", metavar="participation_id", type=int,
+        help="Move the existing booking with the given participation ID to the given slot. The old booking is only cancelled once the new slot has been booked.")
+
+    parser.add_argument("--workers", metavar="n", type=int, default=1,
+        help="Poll with n workers that each use a connection of their own and take turns, checking n times as often without any connection polling more often.")
+
+    parser.add_argument("--daemon", metavar="socket", type=str, nargs="?",
+        const=DAEMON_SOCKET_PATH, default=None,
+        help="Obtain schedules from a running xbookd instead of polling X directly.")
+
+    parser.add_argument("--metrics-file", metavar="path", type=str,
+        help="Periodically write latency metrics and counters to this file, as JSON if it ends with .json and in Prometheus' text format otherwise.")
+    parser.add_argument("--metrics-port", metavar="port", type=int,
+        help="Serve latency metrics and counters on http://127.0.0.1:<port>/metrics.")
+
+    parser.add_argument("--record-history", action="store_true",
+        help="Record when slots are freed and taken, which future polls are spread by. Analyse the recording with xbook_history.py.")
+    parser.add_argument("--all-accounts", action="store_true",
+        help="Book with every account listed under \"accounts\" in config.json. The given slots are divided over the accounts in order.")
+
+    parser.add_argument("--target", "-t", metavar="target", type=str,
+        action="append", default=[],
+        help="An additional slot to watch, formatted as \"DATE HOUR [CATEGORY] [COURT]\". Can be repeated.")
+    parser.add_argument("--targets-file", metavar="path", type=str,
+        help="A JSON file containing a list of slots to watch.")
+    parser.add_argument("--plans", action="store_true",
+        help="Keep booking the weekly slots listed under \"plans\" in config.json, watching each one only once its booking window opens.")
+
+    args = parser.parse_args()
+    if (args.date is None) != (args.hour is None):
+        parser.error("date and hour should be provided together")
+    if args.date is None and not args.target and not args.targets_file \
+            and not args.plans:
+        parser.error("no slot to book was provided")
+
+    # Only regular booking of a single slot supports fallbacks and workers
+    other_modes = {
+        "--target": args.target, "--targets-file": args.targets_file,
+        "--all-accounts": args.all_accounts, "--plans": args.plans,
+        "--at-window-open": args.at_window_open,
+        "--book-first": args.book_first is not None,
+        "--swap": args.swap is not None
+    }
+    for (option, used) in (("--fallback", args.fallback),
+                           ("--workers", args.workers != 1)):
+        conflicts = [mode for (mode, given) in other_modes.items() if given]
+        if used and conflicts:
+            parser.error(f"{option} can't be combined with {conflicts[0]}")
+    if args.password and args.all_accounts:
+        parser.error("--password can't be combined with --all-accounts, "
+                     "which asks for the password of every account")
+    if args.workers != 1 and args.daemon is not None:
+        parser.error("--workers can't be combined with --daemon")
+    if args.workers < 1:
+        parser.error("--workers should be at least 1")
+
+    if args.fallback and args.date is None:
+        parser.error("--fallback requires a date and hour")
+    try:
+        args.fallback = [
+            parse_fallback(f, args.date, args.booking_category, args.utc)
+            for f in args.fallback
+        ]
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Report invalid slots before anything else happens
+    try:
+        args.targets = process_targets(args)
+    except OSError as e:
+        parser.error(f"can't read targets file: {e}")
+    except KeyError as e:
+        parser.error(f"target without {e} in targets file")
+    except ValueError as e:
+        parser.error(str(e))
+
+    return args
 
 
 def load_config():
     """
     Returns a tuple of variables containing the values from "./config.json" and
     a `username` variable containing the `netid` or `email` according to the
-    configured `auth_method`.
+    configured `auth_method`. If only a list of "accounts" is configured, its
+    first account is used.
     """
-    config_path = f"{os.path.dirname(__file__)}/../config.json"
-    with open(config_path, "r") as f:
+    with open(CONFIG_PATH, "r") as f:
         config = json.load(f)
 
-        netid = config["netid"]
-        email = config["email"]
-        member_id = config["member_id"]
-        if member_id:
-            member_id = int(member_id)
-        auth_method = AuthMethod[config["auth_method"].upper()]
-        username = netid if auth_method == AuthMethod.TUD_SSO \
-            else email
-
-        if not username:
-            print("[!] empty username configured for authentication method.")
-            exit(1)
+    if "auth_method" not in config and config.get("accounts"):
+        config = config["accounts"][0]
+
+    return parse_account(config)
+
+
+def load_accounts():
+    """
+    Returns the accounts listed under "accounts" in "./config.json", or the
+    single account configured at the top level if there is no such list.
+    """
+    with open(CONFIG_PATH, "r") as f:
+        config = json.load(f)
+
+    if not config.get("accounts"):
+        return [parse_account(config)]
+
+    return [parse_account(account) for account in config["accounts"]]
+
+
+def load_plans():
+    """
+    Returns the recurring plans listed under "plans" in "./config.json".
+    """
+    from plans import parse_plans
+
+    with open(CONFIG_PATH, "r") as f:
+        config = json.load(f)
+
+    return parse_plans(config.get("plans", []))
+
+
+def parse_account(config):
+    """
+    Returns an `(username, member_id, auth_method)` account tuple for the given
+    account `config`, which contains a `netid`, `email`, `member_id` and
+    `auth_method`.
+    """
+    netid = config.get("netid")
+    email = config.get("email")
+    member_id = config.get("member_id")
+    if member_id:
+        member_id = int(member_id)
+    auth_method = AuthMethod[config["auth_method"].upper()]
+    username = netid if auth_method == AuthMethod.TUD_SSO \
+        else email
 
-    return (username, member_id, auth_method)
+    if not username:
+        print("[!] empty username configured for authentication method.")
+        exit(1)
+
+    return Account(username, member_id, auth_method)
 
 
 def process_args(args):
@@ -68,27 +198,127 @@ def process_args(args):
     Processes and returns the given command line arguments for usage during
     booking.
     """
-    tag_id = BookingTagId.from_string(args.booking_category).value
+    return resolve_category(args.booking_category, args.court)
 
-    subcategory_id = None
-    if args.court:
-        subcategory_id = BEACH_VOLLEYBALL_COURT_PRODUCT_IDS[args.court]
-    if tag_id != BookingTagId.GYM.value:
-        subcategory_id = SubcategoryId.from_string(args.booking_category).value
 
-    return (tag_id, subcategory_id)
+def process_targets(args):
+    """
+    Collects and returns all targets given through the command line arguments.
+    """
+    targets = []
+    if args.date is not None:
+        targets.append(make_target(
+            args.date, args.hour, args.booking_category, args.court, args.utc
+        ))
+
+    targets += [parse_target(t, args.utc) for t in args.target]
+    if args.targets_file:
+        targets += load_targets(args.targets_file, args.utc)
+
+    return targets
+
+
+def book_for_all_accounts(args):
+    """
+    Divides all targets given through the command line arguments over the
+    configured accounts and books them in parallel.
+    """
+    from watch_engine import watch_targets_for_accounts
+
+    accounts = load_accounts()
+    passwords = {
+        account.username: getpass.getpass(
+            f"Password for X login of {account.username}: "
+        )
+        for account in accounts
+    }
+
+    assignments = [
+        (target, accounts[i % len(accounts)])
+        for (i, target) in enumerate(args.targets)
+    ]
+
+    watch_targets_for_accounts(assignments, passwords)
 
 
 if __name__ == "__main__":
     args = parse_args()
+
+    if args.metrics_file or args.metrics_port:
+        from metrics import export_to_file, serve_metrics
+        if args.metrics_file:
+            export_to_file(args.metrics_file)
+        if args.metrics_port:
+            serve_metrics(args.metrics_port)
+
+    if args.record_history:
+        from history import record_history
+        record_history()
+
+    if args.all_accounts:
+        book_for_all_accounts(args)
+        exit(0)
+
     (username, member_id, auth_method) = load_config()
 
     password = getpass.getpass("Password for X login: ") if not args.password \
         else args.password[0]
 
+    if args.plans:
+        from plans import run_plans
+        plans = load_plans()
+        if not plans:
+            print("[!] No plans listed under \"plans\" in config.json.")
+            exit(1)
+
+        run_plans(plans, username, password, auth_method, member_id)
+        exit(0)
+
+    if args.target or args.targets_file:
+        from watch_engine import watch_targets
+        watch_targets(
+            args.targets, username, password, auth_method, member_id
+        )
+        exit(0)
+
     (tag_id, subcategory_id) = process_args(args)
 
+    if args.at_window_open:
+        from window_opening import book_at_window_open
+        slot_str = date_and_hour_to_time_slot_str(
+            args.date, args.hour, in_utc=args.utc
+        )
+        book_at_window_open(
+            slot_str, member_id, username, password, auth_method, tag_id,
+            subcategory_id
+        )
+        exit(0)
+
+    if args.swap is not None:
+        from slot_swap import swap_slot
+        slot_str = date_and_hour_to_time_slot_str(
+            args.date, args.hour, in_utc=args.utc
+        )
+        swap_slot(
+            args.swap, slot_str, member_id, username, password, auth_method,
+            tag_id, subcategory_id, daemon_socket=args.daemon
+        )
+        exit(0)
+
+    if args.book_first is not None:
+        from book_first import book_first
+        slot_str = date_and_hour_to_time_slot_str(
+            args.date, args.hour, in_utc=args.utc
+        )
+        book_first(
+            slot_str, member_id, username, password, auth_method, tag_id,
+            subcategory_id, rate=args.book_first
+        )
+        exit(0)
+
+    from booking import login_and_book_slot
     login_and_book_slot(
         username, password, member_id, auth_method, args.date, args.hour,
-        args.utc, tag_id, subcategory_id
+        args.utc, tag_id, subcategory_id, daemon_socket=args.daemon,
+        workers=args.workers, fallbacks=args.fallback
     )
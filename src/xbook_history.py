@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+import argparse
+import importlib.util
+import os
+import sqlite3
+
+from booking_tag_id import BookingTagId
+from history import HISTORY_PATH
+from slot_store import SlotEventType
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="xbook_history",
+        description="Analyse when slots at X are freed, based on the history recorded with --record-history.")
+
+    parser.add_argument("--path", metavar="path", type=str,
+        help="The history database to analyse.", default=HISTORY_PATH)
+    parser.add_argument("--booking-category", "-b", type=str,
+        help="Only analyse the given category.", default=None)
+
+    return parser.parse_args()
+
+
+def load_events(path, tag_id=None):
+    """
+    Returns the `(observed_at, tag_ids, product_ids, slot_starts, events)`
+    columns of the history database at `path` as NumPy arrays, optionally
+    only for the category with the given `tag_id`.
+    """
+    import numpy as np
+
+    query = "SELECT observed_at, tag_id, product_id, slot_start, event " \
+        "FROM slot_events"
+    params = ()
+    if tag_id is not None:
+        query += " WHERE tag_id = ?"
+        params = (tag_id,)
+
+    db = sqlite3.connect(path)
+    try:
+        rows = np.array(db.execute(query, params).fetchall(), dtype=float)
+    finally:
+        db.close()
+
+    rows = rows.reshape(-1, 5)
+    return (
+        rows[:, 0], rows[:, 1].astype(int), rows[:, 2].astype(int),
+        rows[:, 3].astype(int), rows[:, 4].astype(int)
+    )
+
+
+def analyse(observed_at, tag_ids, product_ids, slot_starts, events):
+    """
+    Computes the cancellation statistics of every category in the given
+    history columns. Returns a dictionary mapping each tag ID to a
+    `(per_hour, lead_hours, fill_seconds)` tuple, where `per_hour` counts the
+    cancellations per UTC hour of the day, `lead_hours` holds the 10th, 50th
+    and 90th percentiles of the hours left until the freed slots started and
+    `fill_seconds` holds the median number of seconds until a freed slot was
+    taken again, or `None` if that never happened.
+    """
+    import numpy as np
+
+    freed = events == SlotEventType.FREED.value
+    filled = events == SlotEventType.FILLED.value
+    hours = (observed_at // 3600 % 24).astype(int)
+    leads = (slot_starts - observed_at) / 3600
+
+    results = {}
+    for tag_id in np.unique(tag_ids[freed]):
+        in_tag = tag_ids == tag_id
+        tag_freed = in_tag & freed
+
+        per_hour = np.bincount(hours[tag_freed], minlength=24)
+        lead_hours = np.percentile(leads[tag_freed], [10, 50, 90])
+
+        tag_filled = in_tag & filled
+        fill_times = _fill_times(
+            observed_at[tag_freed],
+            np.stack((slot_starts[tag_freed], product_ids[tag_freed]), 1),
+            observed_at[tag_filled],
+            np.stack((slot_starts[tag_filled], product_ids[tag_filled]), 1)
+        )
+
+        fill_seconds = float(np.median(fill_times)) if fill_times.size \
+            else None
+        results[int(tag_id)] = (per_hour, lead_hours, fill_seconds)
+
+    return results
+
+
+def _fill_times(freed_at, freed_slots, filled_at, filled_slots):
+    """
+    Returns the number of seconds between every fill and the latest preceding
+    cancellation of the same slot. Slots are given as rows of their start
+    time and product ID, as several courts or halls can start at once.
+    """
+    import numpy as np
+
+    # Key every event by its slot first and its time second, so a single
+    # sorted search finds the preceding cancellation of each fill
+    (_, inverse) = np.unique(
+        np.concatenate((freed_slots, filled_slots)).reshape(-1, 2), axis=0,
+        return_inverse=True
+    )
+    inverse = inverse.ravel()
+    t0 = min(freed_at.min(initial=0), filled_at.min(initial=0))
+    span = max(freed_at.max(initial=0), filled_at.max(initial=0)) - t0 + 1
+    keys = inverse * span + (np.concatenate((freed_at, filled_at)) - t0)
+    (freed_keys, filled_keys) = (keys[:freed_at.size], keys[freed_at.size:])
+
+    order = np.argsort(freed_keys)
+    idx = np.searchsorted(freed_keys[order], filled_keys) - 1
+    matched = order[np.maximum(idx, 0)]
+    valid = (idx >= 0) & \
+        (inverse[:freed_at.size][matched] == inverse[freed_at.size:])
+
+    return filled_at[valid] - freed_at[matched[valid]]
+
+
+def print_analysis(results):
+    for (tag_id, (per_hour, lead_hours, fill_seconds)) in results.items():
+        try:
+            name = str(BookingTagId(tag_id))
+        except ValueError:
+            name = f"Tag {tag_id}"
+
+        total = per_hour.sum()
+        print(f"{name}: {total} cancellation(s)")
+        print(f"  Hours before the slot: {lead_hours[0]:.1f} (p10), "
+              f"{lead_hours[1]:.1f} (p50), {lead_hours[2]:.1f} (p90)")
+        if fill_seconds is not None:
+            print(f"  Median time until taken again: {fill_seconds:.1f} s")
+
+        print("  Cancellations per hour of the day (UTC):")
+        peak = per_hour.max()
+        for (hour, count) in enumerate(per_hour):
+            if count:
+                bar = "#" * max(int(40 * count / peak), 1)
+                print(f"    {hour:02d}:00 {count:6d} {bar}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"[!] No history found at {args.path}. Record some with "
+              f"--record-history first.")
+        exit(1)
+
+    if importlib.util.find_spec("numpy") is None:
+        print("[!] The analysis requires NumPy: pip install numpy")
+        exit(1)
+
+    tag_id = None
+    if args.booking_category is not None:
+        tag_id = BookingTagId.from_string(args.booking_category).value
+
+    results = analyse(*load_events(args.path, tag_id))
+    if not results:
+        print("No cancellations have been recorded yet.")
+    print_analysis(results)
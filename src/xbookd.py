@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+import argparse
+
+from history import record_history
+from metrics import export_to_file, serve_metrics
+from watch_daemon import DAEMON_SOCKET_PATH, ScheduleDaemon
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="xbookd",
+        description="Poll X's schedules once on behalf of all local xbook watchers.")
+
+    parser.add_argument("--socket", metavar="path", type=str,
+        help="The Unix socket on which to serve schedules.",
+        default=DAEMON_SOCKET_PATH)
+    parser.add_argument("--interval", metavar="seconds", type=float,
+        help="The number of seconds between polls of each schedule.",
+        default=1)
+    parser.add_argument("--metrics-file", metavar="path", type=str,
+        help="Periodically write latency metrics and counters to this file.")
+    parser.add_argument("--metrics-port", metavar="port", type=int,
+        help="Serve latency metrics and counters on http://127.0.0.1:<port>/metrics.")
+    parser.add_argument("--record-history", action="store_true",
+        help="Record when slots are freed and taken, which future polls are spread by. Analyse the recording with xbook_history.py.")
+    parser.add_argument("--shared", action="store_true",
+        help="Allow all users on this machine to connect to the socket.")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.metrics_file:
+        export_to_file(args.metrics_file)
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    if args.record_history:
+        record_history()
+
+    daemon = ScheduleDaemon(args.interval)
+    try:
+        daemon.serve(args.socket, mode=0o666 if args.shared else 0o660)
+    except KeyboardInterrupt:
+        pass
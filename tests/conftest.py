@@ -0,0 +1,47 @@
+import os
+import sys
+
+
+# xbook's modules are imported by their bare names, like its scripts do
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from time_slot_manip import (  # noqa: E402
+    epoch_to_time_slot_str, time_slot_str_to_epoch
+)
+
+
+# Friday 15 January 2027, 08:00 UTC
+START = 1800000000
+
+
+def raw_slot(start=START, product_id=28, available=True):
+    """
+    Returns a slot as it appears in X's schedule, starting at the given UNIX
+    timestamp or X timestamp `start`.
+    """
+    if not isinstance(start, str):
+        start = epoch_to_time_slot_str(start)
+
+    return {
+        "startDate": start,
+        "endDate": epoch_to_time_slot_str(
+            time_slot_str_to_epoch(start) + 3600
+        ),
+        "bookableProductId": product_id,
+        "linkedProductId": 20000,
+        "bookingId": 100000,
+        "isAvailable": available
+    }
+
+
+class Response:
+    """
+    A response to a request, as far as xbook looks at it.
+    """
+
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
@@ -0,0 +1,144 @@
+import json
+
+import booking
+from booking import book_authenticated, classify_booking_response
+from booking_result import BookingResult
+from conftest import Response
+from targets import make_target
+
+
+SLOT = {
+    "startDate": "2027-01-15T08:00:00.000Z",
+    "endDate": "2027-01-15T09:00:00.000Z",
+    "bookableProductId": 28,
+    "linkedProductId": 20000,
+    "bookingId": 100000
+}
+
+
+class FakeAuthSession:
+    def __init__(self):
+        self.token = "revoked"
+        self.refreshes = 0
+
+    def get(self):
+        return (object(), self.token, 1234567)
+
+    def refresh(self):
+        self.refreshes += 1
+        self.token = "fresh"
+
+
+def test_rejected_token_is_classified_as_unauthorized():
+    assert classify_booking_response(Response(401)) == \
+        BookingResult.UNAUTHORIZED
+
+
+def test_forbidden_booking_is_not_classified_as_unauthorized():
+    assert classify_booking_response(Response(403, "Forbidden")) == \
+        BookingResult.FAILED
+
+
+def test_rejected_token_is_refreshed_and_booking_retried(monkeypatch):
+    tokens = []
+
+    def try_book_slot(slot, member_id, session, token=None):
+        tokens.append(token)
+        return BookingResult.BOOKED if token == "fresh" \
+            else BookingResult.UNAUTHORIZED
+
+    monkeypatch.setattr(booking, "try_book_slot", try_book_slot)
+    auth_session = FakeAuthSession()
+
+    (result, _) = book_authenticated(SLOT, None, auth_session)
+
+    assert result == BookingResult.BOOKED
+    assert tokens == ["revoked", "fresh"]
+    assert auth_session.refreshes == 1
+
+
+def test_token_is_refreshed_only_once_per_attempt(monkeypatch):
+    monkeypatch.setattr(
+        booking, "try_book_slot",
+        lambda *args, **kwargs: BookingResult.UNAUTHORIZED
+    )
+    auth_session = FakeAuthSession()
+
+    (result, _) = book_authenticated(SLOT, None, auth_session)
+
+    assert result == BookingResult.UNAUTHORIZED
+    assert auth_session.refreshes == 1
+
+
+def test_explicit_message_counts_as_already_booked():
+    for (status_code, text) in [
+        (409, '{"message": "You have already booked this slot"}'),
+        (400, '{"message": "Duplicate participation"}')
+    ]:
+        assert classify_booking_response(Response(status_code, text)) == \
+            BookingResult.ALREADY_BOOKED
+
+
+def test_ambiguous_rejections_keep_watching():
+    assert classify_booking_response(
+        Response(400, '{"message": "Slot is already full"}')
+    ) == BookingResult.FULL
+    assert classify_booking_response(
+        Response(409, '{"message": "Conflict"}')
+    ) == BookingResult.FAILED
+    assert classify_booking_response(Response(409)) == BookingResult.FAILED
+
+
+class StreamedResponse:
+    """
+    A streamed schedule response, or a 304 response if `etag` matches.
+    """
+
+    def __init__(self, body, etag, if_none_match=None):
+        self.status_code = 304 if if_none_match == etag else 200
+        self.headers = {"etag": etag}
+        self.encoding = "utf-8"
+        self.body = body.encode()
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), 7):
+            yield self.body[i:i + 7]
+
+    def close(self):
+        pass
+
+
+def test_batched_and_single_schedules_are_cached_apart(monkeypatch):
+    gym = dict(SLOT, bookableProductId=28)
+    body = '{"data": [' + json.dumps(gym) + "]}"
+
+    def call(send, name, get, url, headers=None, **kwargs):
+        return StreamedResponse(body, '"v1"', headers.get("if-none-match"))
+
+    monkeypatch.setattr(booking.SCHEDULE_POLICY, "call", call)
+    monkeypatch.setattr(booking, "_schedule_cache", {})
+    target = make_target("2027-01-15", 8, "gym", in_utc=True)
+
+    for _ in range(2):
+        assert booking.batched_booking_schedule([target]) == {28: [gym]}
+        assert booking.booking_schedule(
+            target.slot_str, SLOT["endDate"], 28
+        ) == [gym]
+
+
+def test_booking_request_has_a_timeout(monkeypatch):
+    class Session:
+        headers = {}
+
+        def post(self, url, **kwargs):
+            self.timeout = kwargs.get("timeout")
+            return Response(201)
+
+    monkeypatch.setattr(booking, "_booked_slots", set())
+    session = Session()
+    assert booking.try_book_slot(SLOT, 1234567, session, "token") == \
+        BookingResult.BOOKED
+    assert session.timeout == booking.BOOKING_TIMEOUT
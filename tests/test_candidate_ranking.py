@@ -0,0 +1,56 @@
+from candidate_ranking import CandidateRanking
+from conftest import START, raw_slot
+from slot_store import Slot, SlotStore
+from targets import Candidate
+
+
+LATER = START + 3600
+
+
+def slot(start=START, product_id=37, available=True):
+    return Slot(raw_slot(start, product_id, available))
+
+
+def test_earlier_candidates_rank_better():
+    ranking = CandidateRanking([
+        Candidate(slot().start_str, 37),
+        Candidate(slot().start_str, None),
+        Candidate(slot(LATER).start_str, 38)
+    ])
+
+    assert ranking.rank(slot(product_id=37)) == 0
+    assert ranking.rank(slot(product_id=39)) == 1
+    assert ranking.rank(slot(LATER, 38)) == 2
+    assert ranking.rank(slot(LATER, 37)) is None
+
+
+def test_wildcard_ranked_before_exact_candidate_wins():
+    ranking = CandidateRanking([
+        Candidate(slot().start_str, None), Candidate(slot().start_str, 37)
+    ])
+
+    assert ranking.rank(slot(product_id=37)) == 0
+
+
+def test_best_skips_slots_that_are_not_bookable():
+    ranking = CandidateRanking([
+        Candidate(slot().start_str, 37), Candidate(slot(LATER).start_str, 38)
+    ])
+    slots = [slot(LATER, 38), slot(available=False), slot(LATER, 39)]
+
+    (rank, best) = ranking.best(slots, lambda s: s.is_available)
+
+    assert (rank, best.start_str, best.product_id) == \
+        (1, slot(LATER).start_str, 38)
+    assert ranking.best([], lambda s: True) == (None, None)
+
+
+def test_candidates_are_found_in_store():
+    ranking = CandidateRanking([Candidate(slot(LATER).start_str, 38)])
+    store = SlotStore()
+
+    store.apply([raw_slot(product_id=38)], 88)
+    assert not ranking.found_in(store)
+
+    store.apply([raw_slot(LATER, 38)], 88)
+    assert ranking.found_in(store)
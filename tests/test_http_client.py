@@ -0,0 +1,23 @@
+import http_client
+from http_client import dedicated_session, new_session
+
+
+def test_closing_a_session_keeps_the_shared_pool_open():
+    pool_manager = http_client._adapter.poolmanager
+    pool_manager.connection_from_url("http://127.0.0.1:9")
+    pools = len(pool_manager.pools)
+
+    new_session().close()
+
+    assert pools > 0
+    assert len(pool_manager.pools) == pools
+
+
+def test_closing_a_dedicated_session_closes_its_connections():
+    session = dedicated_session()
+    pool_manager = session.get_adapter("http://127.0.0.1:9").poolmanager
+    pool_manager.connection_from_url("http://127.0.0.1:9")
+
+    session.close()
+
+    assert len(pool_manager.pools) == 0
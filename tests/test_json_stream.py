@@ -0,0 +1,41 @@
+import json
+
+from json_stream import JsonArrayStream
+
+
+DOCUMENT = json.dumps({
+    "meta": {"total": 3, "pages": [1, 2]},
+    "data": [
+        {"startDate": "2027-01-15T08:00:00.000Z", "bookingId": 100000},
+        12345,
+        "a \"quoted\" string with a \\ backslash"
+    ]
+})
+
+
+def chunked(s, size):
+    return [s[i:i + size] for i in range(0, len(s), size)]
+
+
+def test_items_are_the_same_for_any_chunk_size():
+    expected = json.loads(DOCUMENT)["data"]
+
+    for size in range(1, len(DOCUMENT) + 1):
+        assert list(JsonArrayStream(chunked(DOCUMENT, size))) == expected
+
+
+def test_number_split_across_chunks_is_read_whole():
+    chunks = ['{"data": [12', '345, 6', '7]}']
+
+    assert list(JsonArrayStream(chunks)) == [12345, 67]
+
+
+def test_top_level_array_is_streamed():
+    assert list(JsonArrayStream(["[1, ", "[2, 3]", ", {}]"])) == \
+        [1, [2, 3], {}]
+
+
+def test_empty_chunks_and_whitespace_are_skipped():
+    chunks = ["", ' {\n "data" ', "", ":[ ", "", "true ] } "]
+
+    assert list(JsonArrayStream(chunks)) == [True]
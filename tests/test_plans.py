@@ -0,0 +1,36 @@
+from itertools import islice
+
+import plans
+from plans import parse_plans, window_openings
+from time_slot_manip import time_slot_str_to_epoch
+
+
+# Monday 11 January 2027, 12:00 UTC
+NOW = 1799668800
+
+
+def test_occurrences_open_in_order_of_their_windows(monkeypatch):
+    monkeypatch.setattr(plans, "tag_booking_window", lambda tag_id: None)
+    weekly = parse_plans([
+        {"days": ["tue", "thu"], "hour": 17, "category": "gym"},
+        {"days": "fri", "hour": 19, "category": "beach", "court": 2}
+    ])
+
+    openings = list(islice(window_openings(weekly, NOW), 6))
+
+    assert [o for (o, _) in openings] == sorted(o for (o, _) in openings)
+    (opens_at, first) = openings[0]
+    assert first.slot_str == "2027-01-12T16:00:00.000Z"
+    assert opens_at == time_slot_str_to_epoch(first.slot_str) - 604800
+
+
+def test_unknown_windows_expand_one_occurrence_at_a_time(monkeypatch):
+    monkeypatch.setattr(plans, "tag_booking_window", lambda tag_id: None)
+    monkeypatch.setattr(plans, "discover_booking_window", lambda *args: None)
+    weekly = parse_plans([{"days": ["mon"], "hour": 19, "category": "kick"}])
+
+    openings = list(islice(window_openings(weekly, NOW), 3))
+
+    assert openings[0][0] == NOW
+    for ((_, previous), (opens_at, _)) in zip(openings, openings[1:]):
+        assert opens_at == time_slot_str_to_epoch(previous.slot_str)
@@ -0,0 +1,49 @@
+import threading
+
+from poller_pool import PollerPool
+
+
+class EagerScheduler:
+    """
+    A scheduler under which a poll is always due.
+    """
+
+    def __init__(self):
+        self.polls = []
+        self.lock = threading.Lock()
+
+    def delay(self):
+        return 0
+
+    def record_poll(self, changed=False):
+        with self.lock:
+            self.polls.append(changed)
+
+    def postpone(self, seconds):
+        pass
+
+
+def test_unchanged_schedules_are_delivered():
+    slots = [{"startDate": "2027-01-15T08:00:00.000Z", "isAvailable": True}]
+    scheduler = EagerScheduler()
+    pool = PollerPool(lambda session: slots, scheduler, workers=2)
+    try:
+        delivered = [next(pool) for _ in range(5)]
+    finally:
+        pool.close()
+
+    assert delivered == [slots] * 5
+
+
+def test_out_of_order_results_are_dropped():
+    # Polls of the pool itself fail, so only the results below count
+    pool = PollerPool(lambda session: None, EagerScheduler(), workers=1)
+    pool.close()
+
+    pool._complete(2, ["later"])
+    pool._complete(1, ["earlier"])
+    pool._complete(3, ["later"])
+
+    assert [pool._results.get_nowait() for _ in range(2)] == \
+        [["later"], ["later"]]
+    assert pool._results.empty()
@@ -0,0 +1,52 @@
+import pytest
+import requests
+
+from conftest import Response
+from retry_policy import CircuitOpenError, RetryPolicy
+
+
+def failing(e):
+    def send():
+        raise e
+    return send
+
+
+def open_circuit():
+    policy = RetryPolicy(
+        "test", max_attempts=1, failure_threshold=2, reset_timeout=0
+    )
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            policy.call(failing(requests.ConnectionError()))
+
+    return policy
+
+
+def test_successful_trial_closes_the_circuit():
+    policy = open_circuit()
+
+    assert policy.call(lambda: Response(200)).status_code == 200
+    assert policy.call(lambda: Response(200)).status_code == 200
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError(), ValueError()
+])
+def test_trial_that_raises_allows_another_trial(error):
+    policy = open_circuit()
+
+    with pytest.raises(type(error)):
+        policy.call(failing(error))
+
+    assert policy.call(lambda: Response(200)).status_code == 200
+
+
+def test_requests_wait_for_the_trial():
+    policy = open_circuit()
+
+    def send():
+        with pytest.raises(CircuitOpenError):
+            policy.call(lambda: Response(200))
+        return Response(200)
+
+    assert policy.call(send).status_code == 200
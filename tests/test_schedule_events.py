@@ -0,0 +1,56 @@
+from conftest import START, raw_slot
+from schedule_events import ScheduleEvents
+from slot_store import SlotEventType
+
+
+WINDOW = 60
+
+
+def test_slot_is_bookable_when_its_window_opened_event_fires():
+    events = ScheduleEvents(28, WINDOW)
+    events.feed([raw_slot()], now=START - WINDOW - 5)
+
+    now = START - WINDOW + 0.3
+    opened = events.feed([raw_slot()], now=now)
+
+    assert [e.type for e in opened] == [SlotEventType.WINDOW_OPENED]
+    assert events.store.is_bookable(opened[0].slot, WINDOW, now)
+
+
+def test_slot_is_bookable_at_the_exact_opening():
+    events = ScheduleEvents(28, WINDOW)
+    events.feed([raw_slot()], now=START - WINDOW - 5)
+
+    opened = events.feed([raw_slot()], now=START - WINDOW)
+
+    assert [e.type for e in opened] == [SlotEventType.WINDOW_OPENED]
+    assert events.store.is_bookable(opened[0].slot, WINDOW, START - WINDOW)
+
+
+def test_slot_is_not_bookable_before_its_window_opens():
+    events = ScheduleEvents(28, WINDOW)
+    events.feed([raw_slot()], now=START - WINDOW - 5)
+
+    assert events.feed([raw_slot()], now=START - WINDOW - 0.5) == []
+    slot = events.store.find(raw_slot()["startDate"])
+    assert not events.store.is_bookable(slot, WINDOW, START - WINDOW - 0.5)
+
+
+def test_smaller_window_tracks_slots_that_looked_open_before():
+    events = ScheduleEvents(28, 31536000)
+    events.feed([raw_slot()], now=START - 7 * 86400)
+
+    events.set_booking_window(3 * 86400, now=START - 7 * 86400)
+    now = START - 3 * 86400 + 5
+    opened = events.feed([raw_slot()], now=now)
+
+    assert [e.type for e in opened] == [SlotEventType.WINDOW_OPENED]
+    assert events.store.is_bookable(opened[0].slot, 3 * 86400, now)
+
+
+def test_window_opened_is_reported_once():
+    events = ScheduleEvents(28, WINDOW)
+    events.feed([raw_slot()], now=START - WINDOW - 5)
+
+    assert len(events.feed([raw_slot()], now=START - WINDOW + 1)) == 1
+    assert events.feed([raw_slot()], now=START - WINDOW + 2) == []
@@ -0,0 +1,67 @@
+from conftest import raw_slot
+from schedule_query import ScheduleQuery, demultiplex, plan_queries
+from targets import make_target
+
+
+def test_categories_with_products_share_a_query():
+    targets = [
+        make_target("2027-01-15", 9, "beach", 2, in_utc=True),
+        make_target("2027-01-15", 10, "X1", "X1A", in_utc=True),
+        make_target("2027-01-15", 11, "beach", 3, in_utc=True)
+    ]
+
+    assert plan_queries(targets) == [
+        ScheduleQuery(
+            "2027-01-15T09:00:00.000Z", "2027-01-15T12:00:00.000Z",
+            {88: {37, 38}, 147: {4}}
+        )
+    ]
+
+
+def test_categories_of_any_product_get_a_query_of_their_own():
+    targets = [
+        make_target("2027-01-15", 9, "gym", in_utc=True),
+        make_target("2027-01-15", 9, "beach", 2, in_utc=True)
+    ]
+
+    queries = plan_queries(targets)
+
+    assert [q.tag_products for q in queries] == [{28: None}, {88: {37}}]
+
+
+def test_distant_targets_are_queried_apart():
+    targets = [
+        make_target("2027-01-15", 9, "gym", in_utc=True),
+        make_target("2027-01-15", 20, "gym", in_utc=True)
+    ]
+
+    queries = plan_queries(targets, max_gap=6 * 3600)
+
+    assert [(q.start_str, q.end_str) for q in queries] == [
+        ("2027-01-15T09:00:00.000Z", "2027-01-15T10:00:00.000Z"),
+        ("2027-01-15T20:00:00.000Z", "2027-01-15T21:00:00.000Z")
+    ]
+
+
+def test_slots_are_split_by_category():
+    query = ScheduleQuery(
+        "2027-01-15T09:00:00.000Z", "2027-01-15T10:00:00.000Z",
+        {88: {37, 38}, 147: {4}}
+    )
+    (court, hall, other) = (
+        raw_slot(product_id=37), raw_slot(product_id=4),
+        raw_slot(product_id=5)
+    )
+
+    assert demultiplex(query, iter([court, hall, other])) == {
+        88: [court], 147: [hall]
+    }
+
+
+def test_category_of_any_product_gets_every_slot():
+    query = ScheduleQuery(
+        "2027-01-15T09:00:00.000Z", "2027-01-15T10:00:00.000Z", {28: None}
+    )
+    slots = [raw_slot(product_id=28), raw_slot(product_id=29)]
+
+    assert demultiplex(query, slots) == {28: slots}
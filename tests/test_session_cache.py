@@ -0,0 +1,43 @@
+import os
+import threading
+
+import session_cache
+from session_cache import AuthSession, load_cache, update_cache
+
+
+def test_concurrent_updates_keep_every_entry(tmp_path):
+    path = str(tmp_path / "sessions.json")
+
+    def store(i):
+        for j in range(20):
+            update_cache(path, {f"account{i}:{j}": {"token": str(j)}})
+
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(load_cache(path)) == 8 * 20
+    assert os.listdir(tmp_path) == ["sessions.json"]
+
+
+def test_cache_is_readable_only_by_the_user(tmp_path):
+    path = str(tmp_path / "sessions.json")
+    update_cache(path, {"account": {"token": "secret"}})
+
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_short_lived_tokens_are_refreshed_halfway(monkeypatch):
+    monkeypatch.setattr(session_cache.time, "time", lambda: 1000)
+    auth_session = AuthSession("user", "passw", None, refresh_margin=300)
+    (auth_session.issued_at, auth_session.expires_at) = (1000, 1120)
+
+    assert auth_session._refresh_delay() == 60
+
+    auth_session.expires_at = 5000
+    assert auth_session._refresh_delay() == 5000 - 300 - 1000
+
+    auth_session.expires_at = 1000
+    assert auth_session._refresh_delay() == session_cache.MIN_REFRESH_INTERVAL
@@ -0,0 +1,26 @@
+from conftest import START, raw_slot
+from slot_store import SlotEventType, SlotStore
+
+
+def test_availability_changes_become_events():
+    store = SlotStore()
+
+    assert [e.type for e in store.apply([raw_slot(available=False)], 28)] == \
+        [SlotEventType.ADDED]
+    assert [e.type for e in store.apply([raw_slot()], 28)] == \
+        [SlotEventType.FREED]
+    assert store.apply([raw_slot()], 28) == []
+    assert [e.type for e in store.apply([], 28)] == [SlotEventType.REMOVED]
+
+
+def test_slots_missing_from_the_latest_poll_are_not_bookable():
+    store = SlotStore()
+    store.apply([raw_slot(product_id=36), raw_slot(product_id=37)], 88)
+    store.apply([raw_slot(product_id=36)], 88)
+
+    assert store.is_bookable(
+        store.find(raw_slot()["startDate"], 36), 60, START - 60
+    )
+    assert not store.is_bookable(
+        store.find(raw_slot()["startDate"], 37), 60, START - 60
+    )
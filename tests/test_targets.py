@@ -0,0 +1,44 @@
+import pytest
+
+from constants import BEACH_VOLLEYBALL_COURT_PRODUCT_IDS
+from subcategory_id import SubcategoryId
+from targets import parse_fallback, parse_target
+
+
+def test_fallback_courts_are_resolved_in_their_category():
+    assert parse_fallback("19 2", "2027-01-11", "beach").subcategory_id == \
+        BEACH_VOLLEYBALL_COURT_PRODUCT_IDS[2]
+    assert parse_fallback("19 x1a", "2027-01-11", "x1").subcategory_id == \
+        SubcategoryId.X1A.value
+    assert parse_fallback("20", "2027-01-11", "x1").subcategory_id is None
+
+
+@pytest.mark.parametrize(("fallback", "category"), [
+    ("19 5", "beach"), ("19 2", "x1"), ("19 x1a", "beach"), ("19 x3a", "x1")
+])
+def test_courts_outside_the_category_are_rejected(fallback, category):
+    with pytest.raises(ValueError):
+        parse_fallback(fallback, "2027-01-11", category)
+
+
+def test_fallback_on_another_day():
+    fallback = parse_fallback("2027-01-12 19", "2027-01-11", "gym", True)
+
+    assert fallback.slot_str == "2027-01-12T19:00:00.000Z"
+
+
+def test_target_courts_are_resolved_in_their_category():
+    target = parse_target("2027-01-11 19 beach 2", in_utc=True)
+
+    assert (target.tag_id, target.subcategory_id) == \
+        (88, BEACH_VOLLEYBALL_COURT_PRODUCT_IDS[2])
+    assert parse_target("2027-01-11 19 x1 x1b").subcategory_id == \
+        SubcategoryId.X1B.value
+
+
+@pytest.mark.parametrize("target", [
+    "2027-01-11 19 x1 2", "2027-01-11 19 gym 2", "2027-01-11 19 beach 7"
+])
+def test_target_courts_outside_the_category_are_rejected(target):
+    with pytest.raises(ValueError):
+        parse_target(target)
@@ -0,0 +1,47 @@
+from time_slot_manip import (
+    date_and_hour_to_time_slot_str, epoch_to_time_slot_str,
+    time_slot_str_to_epoch
+)
+
+
+def test_hours_are_local_to_x_in_winter_and_summer():
+    assert date_and_hour_to_time_slot_str("2027-01-15", 9) == \
+        "2027-01-15T08:00:00.000Z"
+    assert date_and_hour_to_time_slot_str("2027-07-15", 9) == \
+        "2027-07-15T07:00:00.000Z"
+
+
+def test_hours_around_dst_changes():
+    # Clocks go forward at 02:00 on 28 March 2027 and back at 03:00 on 31
+    # October 2027
+    assert date_and_hour_to_time_slot_str("2027-03-28", 1) == \
+        "2027-03-28T00:00:00.000Z"
+    assert date_and_hour_to_time_slot_str("2027-03-28", 3) == \
+        "2027-03-28T01:00:00.000Z"
+    assert date_and_hour_to_time_slot_str("2027-10-31", 1) == \
+        "2027-10-30T23:00:00.000Z"
+    assert date_and_hour_to_time_slot_str("2027-10-31", 4) == \
+        "2027-10-31T03:00:00.000Z"
+
+
+def test_utc_hours_are_kept():
+    assert date_and_hour_to_time_slot_str("2027-07-15", 9, in_utc=True) == \
+        "2027-07-15T09:00:00.000Z"
+    assert date_and_hour_to_time_slot_str(
+        "2027-07-15", 9, in_utc=True, with_millis=False
+    ) == "2027-07-15T09:00:00"
+
+
+def test_epoch_conversion_round_trips():
+    for epoch in (0, 951782400, 1800000000, 1806364800, 4107542399):
+        assert time_slot_str_to_epoch(epoch_to_time_slot_str(epoch)) == epoch
+
+    assert epoch_to_time_slot_str(1800000000) == "2027-01-15T08:00:00.000Z"
+    # 29 February 2000, on a leap day of a leap century
+    assert epoch_to_time_slot_str(951782400) == "2000-02-29T00:00:00.000Z"
+
+
+def test_timestamps_in_other_formats_are_parsed():
+    assert time_slot_str_to_epoch("2027-01-15T08:00:00Z") == 1800000000
+    assert time_slot_str_to_epoch("2027-01-15T09:00:00+01:00") == 1800000000
+    assert time_slot_str_to_epoch("2027-01-15T08:00:00") == 1800000000
@@ -0,0 +1,25 @@
+from account import Account
+from auth_method import AuthMethod
+from conftest import raw_slot
+from targets import make_target
+from watch_engine import _GroupWatch
+
+
+ACCOUNT = Account("a@b.c", 1234567, AuthMethod.OTHER)
+
+
+def test_watches_of_one_category_on_different_days_keep_their_own_slots():
+    monday = make_target("2027-01-11", 18, "gym", in_utc=True)
+    tuesday = make_target("2027-01-12", 18, "gym", in_utc=True)
+    watches = [
+        _GroupWatch(28, [(target, ACCOUNT)], 1)
+        for target in (monday, tuesday)
+    ]
+
+    # A batch covering both days obtains the slots of both days for the tag
+    slots = [raw_slot(monday.slot_str), raw_slot(tuesday.slot_str)]
+
+    assert [s["startDate"] for s in watches[0].own_slots(slots)] == \
+        [monday.slot_str]
+    assert [s["startDate"] for s in watches[1].own_slots(slots)] == \
+        [tuesday.slot_str]
@@ -0,0 +1,49 @@
+import json
+import sys
+
+import pytest
+
+from auth_method import AuthMethod
+import xbook
+from xbook import load_accounts, load_config, parse_args
+
+
+def parse(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["xbook", *argv])
+    return parse_args()
+
+
+def test_workers_are_rejected_with_daemon(monkeypatch, capsys):
+    with pytest.raises(SystemExit):
+        parse(monkeypatch, "2027-01-15", "9", "--workers", "2", "--daemon")
+
+    assert "--workers can't be combined with --daemon" in \
+        capsys.readouterr().err
+
+
+def test_workers_are_accepted_on_their_own(monkeypatch):
+    args = parse(monkeypatch, "2027-01-15", "9", "--workers", "2")
+
+    assert args.workers == 2
+    assert args.daemon is None
+
+
+def test_password_is_rejected_with_all_accounts(monkeypatch, capsys):
+    with pytest.raises(SystemExit):
+        parse(monkeypatch, "2027-01-15", "9", "--all-accounts",
+              "--password", "secret")
+
+    assert "--password can't be combined with --all-accounts" in \
+        capsys.readouterr().err
+
+
+def test_config_with_only_accounts_uses_the_first(monkeypatch, tmp_path):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps({"accounts": [
+        {"netid": "jsmith", "member_id": "", "auth_method": "tud_sso"},
+        {"email": "a@b.c", "member_id": "", "auth_method": "other"}
+    ]}))
+    monkeypatch.setattr(xbook, "CONFIG_PATH", str(config_path))
+
+    assert load_config() == ("jsmith", "", AuthMethod.TUD_SSO)
+    assert len(load_accounts()) == 2
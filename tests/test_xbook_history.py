@@ -0,0 +1,46 @@
+import pytest
+
+from history import HistoryRecorder
+from slot_store import SlotEvent, SlotEventType
+from xbook_history import analyse, load_events
+
+
+np = pytest.importorskip("numpy")
+
+START = 1800000000
+
+
+class Slot:
+    def __init__(self, product_id, start=START):
+        self.product_id = product_id
+        self.start = start
+
+
+def record(path, events):
+    recorder = HistoryRecorder(path)
+    for (now, event_type, product_id) in events:
+        recorder.record(28, [SlotEvent(event_type, Slot(product_id))], now)
+    recorder.close()
+
+
+def test_fills_are_matched_to_cancellations_of_the_same_product(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    record(path, [
+        (START - 7200, SlotEventType.FREED, 36),
+        (START - 3600, SlotEventType.FREED, 37),
+        (START - 3590, SlotEventType.FILLED, 36)
+    ])
+
+    (_, _, fill_seconds) = analyse(*load_events(path))[28]
+
+    assert fill_seconds == 3610
+
+
+def test_cancellations_without_fills(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    record(path, [(START - 7200, SlotEventType.FREED, 36)])
+
+    (per_hour, _, fill_seconds) = analyse(*load_events(path))[28]
+
+    assert per_hour.sum() == 1
+    assert fill_seconds is None